@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+The purpose of this module is to contain the code that is used for the
+Computer Graphics application in the Jupyter Guide to Linear Algebra.
+
+Points in the plane or in space are stored as the rows of an Nx2 or Nx3
+array.  Translations cannot be carried out with matrix multiplication in
+the usual coordinates, so transformations are represented by 3x3 or 4x4
+matrices that act on homogeneous coordinates (x,y,1) or (x,y,z,1).  A chain
+of transformations is then a single matrix, the product of the matrices in
+the chain.
+"""
+import math
+import numpy as np
+
+def Affine(A, b = None):
+    '''
+    Affine(A, b = None)
+
+    Builds the homogeneous matrix of the transformation X -> AX + b, where
+    A is a 2x2 or 3x3 matrix and b is a vector of translations.  This
+    includes the reflections, stretches and shears of Planar_Transformations.
+
+    Parameters
+    ----------
+    A : NumPy array object of dimension dxd
+    b : optional NumPy array object of dimension d
+
+    Returns
+    -------
+    M : NumPy array object of dimension (d+1)x(d+1)
+    '''
+    A = np.asarray(A,dtype='float64')
+    d = A.shape[0]
+    if (A.shape != (d,d) or d not in [2,3]):
+        raise ValueError("A must be a 2x2 or 3x3 array.")
+    M = np.eye(d+1)
+    M[:d,:d] = A
+    if (b is not None):
+        M[:d,d] = np.reshape(b,d)
+    return M
+
+
+def AnimateFrames(points, matrices, out = None):
+    '''
+    AnimateFrames(points, matrices, out = None)
+
+    A generator that produces the image of points under each homogeneous
+    matrix in matrices, in order, for drawing the frames of an animation.
+    Every frame is written into the same array, out, which is created once
+    if it is not given.  The array produced for one frame is overwritten
+    by the next, so it must be copied if it is to be kept.
+
+    Example
+    -------
+    for frame in AnimateFrames(points,matrices):
+        ax.plot(frame[:,0],frame[:,1],'b')
+
+    Parameters
+    ----------
+    points : NumPy array object of dimension Nxd
+    matrices : iterable of NumPy array objects of dimension (d+1)x(d+1)
+    out : optional NumPy array object of dimension Nxd
+
+    Yields
+    ------
+    frame : NumPy array object of dimension Nxd (always the array out)
+    '''
+    for M in matrices:
+        if (out is None):
+            out = np.empty(points.shape,dtype=np.result_type(M,points))
+        yield ApplyHomogeneous(M,points,out=out)
+
+
+def ApplyHomogeneous(M, points, out = None):
+    '''
+    ApplyHomogeneous(M, points, out = None)
+
+    Applies the affine transformation with homogeneous matrix M to every
+    row of points.  Rather than adding a column of ones to the points, the
+    linear part of M is applied with a single matrix product and the
+    translation part is then added, so no temporary arrays are needed.
+    If out is given, the results are written into it.
+
+    Parameters
+    ----------
+    M : NumPy array object of dimension (d+1)x(d+1)
+    points : NumPy array object of dimension Nxd
+    out : optional NumPy array object of dimension Nxd
+
+    Returns
+    -------
+    transformed : NumPy array object of dimension Nxd
+    '''
+    d = M.shape[0] - 1
+    if (points.ndim != 2 or points.shape[1] != d):
+        raise ValueError("points must have dimension Nx"+str(d)+".")
+    if (out is None):
+        out = np.empty(points.shape,dtype=np.result_type(M,points))
+    elif (out.shape != points.shape):
+        raise ValueError("out must have the same dimension as points.")
+
+    np.matmul(points,M[:d,:d].transpose(),out=out)
+    out += M[:d,d]
+    return out
+
+
+def Rotation(theta, axis = None):
+    '''
+    Rotation(theta, axis = None)
+
+    Builds the homogeneous matrix of a rotation by the angle theta (in
+    radians, counterclockwise).  If axis is None, the rotation is of the
+    plane about the origin.  Otherwise axis is one of 'x', 'y', or 'z' and
+    the rotation is of space about that coordinate axis.
+
+    Parameters
+    ----------
+    theta : float
+    axis : optional string
+
+    Returns
+    -------
+    M : NumPy array object of dimension 3x3, or 4x4 if axis is given
+    '''
+    c = math.cos(theta)
+    s = math.sin(theta)
+    R = np.array([[c,-s],[s,c]])
+    if (axis is None):
+        return Affine(R)
+
+    if (axis not in ['x','y','z']):
+        raise ValueError("axis must be 'x', 'y', or 'z'.")
+    # The two coordinates that are rotated, in order so that the rotation
+    # is counterclockwise when viewed from the positive end of the axis
+    plane = {'x':[1,2], 'y':[2,0], 'z':[0,1]}[axis]
+    A = np.eye(3)
+    A[np.ix_(plane,plane)] = R
+    return Affine(A)
+
+
+def Scaling(*factors):
+    '''
+    Scaling(*factors)
+
+    Builds the homogeneous matrix that stretches each coordinate by the
+    corresponding factor.  Two factors give a transformation of the plane,
+    and three give a transformation of space.
+
+    Parameters
+    ----------
+    factors : 2 or 3 floats
+
+    Returns
+    -------
+    M : NumPy array object of dimension 3x3 or 4x4
+    '''
+    return Affine(np.diag(np.array(factors,dtype='float64')))
+
+
+class TransformPipeline:
+    '''
+    TransformPipeline(dimension = 2, dtype = 'float64')
+
+    TransformPipeline records a chain of affine transformations of the
+    plane (dimension 2) or of space (dimension 3), in the order they are
+    to be applied, and applies the whole chain to sets of points.
+
+    The product of the matrices in the chain is computed once, when it is
+    first needed, and kept until another transformation is added, so the
+    chain is applied to any number of points with a single matrix product.
+    If dtype is 'float32', the product is stored and applied in single
+    precision, which halves the memory needed for large sets of points.
+    The product itself is always computed in double precision.
+
+    Example
+    -------
+    pipeline = TransformPipeline().rotate(math.pi/6).translate(3,1)
+    coords_transformed = pipeline.apply(coords)
+
+    Parameters
+    ----------
+    dimension : optional int, 2 or 3
+    dtype : optional string, 'float64' or 'float32'
+
+    Attributes
+    ----------
+    dimension : int
+    dtype : NumPy dtype
+    transforms : list of NumPy array objects of dimension
+                 (dimension+1)x(dimension+1)
+    '''
+
+    def __init__(self, dimension = 2, dtype = 'float64'):
+        if (dimension not in [2,3]):
+            raise ValueError("dimension must be 2 or 3.")
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self.transforms = []
+        self._matrix = None
+
+    def append(self, M):
+        '''
+        append(M)
+
+        Adds a transformation to the end of the chain.  M is either the
+        homogeneous matrix of the transformation, or a matrix of dimension
+        dimension x dimension for a linear transformation.  The pipeline
+        is returned so that calls can be chained.
+
+        Parameters
+        ----------
+        M : NumPy array object of dimension (d+1)x(d+1) or dxd
+
+        Returns
+        -------
+        pipeline : TransformPipeline
+        '''
+        d = self.dimension
+        M = np.asarray(M,dtype='float64')
+        if (M.shape == (d,d)):
+            M = Affine(M)
+        if (M.shape != (d+1,d+1)):
+            raise ValueError("M must have dimension "+str(d+1)+"x"+str(d+1)
+                             +" or "+str(d)+"x"+str(d)+".")
+        self.transforms.append(M)
+        self._matrix = None
+        return self
+
+    def translate(self, *offsets):
+        '''
+        translate(*offsets)
+
+        Adds a translation to the chain.  See Translation.
+        '''
+        return self.append(Translation(*offsets))
+
+    def rotate(self, theta, axis = None):
+        '''
+        rotate(theta, axis = None)
+
+        Adds a rotation to the chain.  See Rotation.  An axis must be given
+        if the dimension is 3.
+        '''
+        if (self.dimension == 3 and axis is None):
+            raise ValueError("An axis is required for rotations of space.")
+        return self.append(Rotation(theta,axis))
+
+    def scale(self, *factors):
+        '''
+        scale(*factors)
+
+        Adds a scaling to the chain.  See Scaling.
+        '''
+        return self.append(Scaling(*factors))
+
+    @property
+    def matrix(self):
+        '''
+        The homogeneous matrix of the whole chain.  The last transformation
+        added is on the left of the product, since it is applied last.
+        '''
+        if (self._matrix is None):
+            M = np.eye(self.dimension+1)
+            for T in self.transforms:
+                M = T@M
+            self._matrix = M.astype(self.dtype)
+        return self._matrix
+
+    def apply(self, points, out = None):
+        '''
+        apply(points, out = None)
+
+        Applies the chain of transformations to every row of points with
+        a single matrix product.  See ApplyHomogeneous.
+
+        Parameters
+        ----------
+        points : NumPy array object of dimension Nxd
+        out : optional NumPy array object of dimension Nxd
+
+        Returns
+        -------
+        transformed : NumPy array object of dimension Nxd
+        '''
+        points = np.asarray(points)
+        if (out is None):
+            out = np.empty(points.shape,dtype=self.dtype)
+        return ApplyHomogeneous(self.matrix,points,out=out)
+
+    def frames(self, points, steps, out = None):
+        '''
+        frames(points, steps, out = None)
+
+        A generator that produces the images of points after 0, 1, ...,
+        steps applications of the chain, as in an animation where the same
+        motion is repeated.  Each frame is computed from the original
+        points using the corresponding power of the chain's matrix, so
+        errors do not build up from frame to frame.  Every frame is written
+        into the same array; see AnimateFrames.
+
+        Parameters
+        ----------
+        points : NumPy array object of dimension Nxd
+        steps : int
+        out : optional NumPy array object of dimension Nxd
+
+        Yields
+        ------
+        frame : NumPy array object of dimension Nxd
+        '''
+        def Powers():
+            M = self.matrix.astype('float64')
+            M_k = np.eye(self.dimension+1)
+            for k in range(steps+1):
+                yield M_k.astype(self.dtype)
+                M_k = M@M_k
+
+        points = np.asarray(points)
+        if (out is None):
+            out = np.empty(points.shape,dtype=self.dtype)
+        return AnimateFrames(points,Powers(),out=out)
+
+
+def Translation(*offsets):
+    '''
+    Translation(*offsets)
+
+    Builds the homogeneous matrix that adds offsets to the coordinates.
+    Two offsets give a translation of the plane, and three give a
+    translation of space.
+
+    Parameters
+    ----------
+    offsets : 2 or 3 floats
+
+    Returns
+    -------
+    M : NumPy array object of dimension 3x3 or 4x4
+    '''
+    return Affine(np.eye(len(offsets)),np.array(offsets,dtype='float64'))
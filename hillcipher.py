@@ -7,15 +7,38 @@ Created on Nov 5 12:07:23 2020
 The purpose of this module is to contain the code that is used for the 
 Hill Cipher application in the Jupyter Guide to Linear Algebra.
 """
+import functools
+import itertools
+import multiprocessing
 import numpy as np
 import laguide as lag
-import random
 
 letter_list =' .?ABCDEFGHIJKLMNOPQRSTUVWXYZ'
 alphabet = []
 for letter in letter_list:
     alphabet.append(letter)
 
+# Lookup tables for converting between bytes and alphabet indices.  
+# encode_table maps each byte value to its index in the alphabet, treating
+# lower case letters as upper case, and maps all other bytes to 255.
+# decode_table maps each index to the byte value of the character.
+encode_table = np.full(256,255,dtype='uint8')
+for i, letter in enumerate(alphabet):
+    encode_table[ord(letter)] = i
+    encode_table[ord(letter.lower())] = i
+decode_table = np.array([ord(letter) for letter in alphabet],dtype='uint8')
+
+# Approximate frequencies of the characters in English text, used by
+# KeySearch to score candidate decryptions.
+english_frequencies = {' ':0.18, '.':0.01, '?':0.001,
+    'A':0.0661, 'B':0.0104, 'C':0.0225, 'D':0.0344, 'E':0.1028, 'F':0.0180,
+    'G':0.0163, 'H':0.0493, 'I':0.0564, 'J':0.0012, 'K':0.0062, 'L':0.0326,
+    'M':0.0195, 'N':0.0546, 'O':0.0608, 'P':0.0156, 'Q':0.0008, 'R':0.0485,
+    'S':0.0512, 'T':0.0733, 'U':0.0223, 'V':0.0079, 'W':0.0191, 'X':0.0012,
+    'Y':0.0159, 'Z':0.0006}
+common_words = ['THE','AND','OF','TO','IN','IS','IT','THAT','WAS','FOR',
+                'ON','ARE','AS','WITH','BE','AT','THIS','HAVE','FROM','BY']
+
 def AlphaMessage_to_NumericMessage(msg):
     ''' 
     AlphaMessage_to_NumericMessage(msg)
@@ -23,6 +46,7 @@ def AlphaMessage_to_NumericMessage(msg):
     Translates a string to a list of values, based on the indices of the 
     alphabet contained in this module.  Returns a list.  Any characters in
     the string that are not in the alphabet are not included in the list.
+    See EncodeMessage for other ways to handle these characters.
 
     Parameters
     ----------
@@ -32,13 +56,7 @@ def AlphaMessage_to_NumericMessage(msg):
     -------
     plaintext: List containing ints
     '''
-    plaintext = []
-    
-    for char in msg.upper():
-        if (char in alphabet):
-            plaintext.append(alphabet.index(char))
-        else:
-            print(char,"is not included in the current alphabet.")
+    plaintext = EncodeMessage(msg,unknown='warn').tolist()
 
     return plaintext
 
@@ -52,22 +70,172 @@ def CheckEncryptionMatrix(A):
 
     Parameters
     ----------
-    A: NumPy array object of dimension nxn
+    A: NumPy array object of dimension nxn, or HillKey
 
     Returns
     -------
     True or False
     '''
-    # Check shape of A
-    if (A.shape[0] != A.shape[1]):
+    # Check shape of A.  A HillKey is always square.
+    if (not isinstance(A,HillKey) and A.shape[0] != A.shape[1]):
         print("Encryption matrix must be square.")
         return False
 
     # Check if det A has inverse mod N
-    if (ModularInverse(lag.DeterminantIteration(A),len(alphabet))):
-        return True
+    return GetHillKey(A).valid
+
+
+def DecodeMessage(values):
+    '''
+    DecodeMessage(values)
+    
+    Translates an array of alphabet indices into a string using 
+    decode_table.  Values are reduced mod N, the length of the alphabet.
+    The whole array is translated at once.
+
+    Parameters
+    ----------
+    values: NumPy array object or list containing ints
+    
+    Returns
+    -------
+    text: String
+    '''
+    values = np.asarray(values).reshape(-1)%len(alphabet)
+    text = decode_table[values].tobytes().decode('ascii')
+
+    return text
+
+
+def EncodeMessage(msg,unknown = 'drop',replacement = ' '):
+    '''
+    EncodeMessage(msg,unknown = 'drop',replacement = ' ')
+    
+    Translates a string (or bytes) to a NumPy array of alphabet indices
+    using encode_table.  The whole message is translated at once.  Lower 
+    case letters are treated as upper case.  Characters that are not in 
+    the alphabet are handled according to unknown.
+
+    'drop' removes them from the message.
+    'replace' substitutes the index of the character replacement.
+    'raise' raises a ValueError.
+    'count' removes them and also returns the number removed.
+    'warn' removes them and prints a single message listing them.
+
+    Parameters
+    ----------
+    msg: String or bytes
+    unknown: optional string
+    replacement: optional string of length 1, must be in the alphabet
+
+    Returns
+    -------
+    values: NumPy array object of dimension (n,) containing uint8
+    count: int, only returned if unknown is 'count'
+    '''
+    if (unknown not in ['drop','replace','raise','count','warn']):
+        raise ValueError("unknown must be 'drop', 'replace', 'raise', "
+                         "'count', or 'warn'.")
+
+    if (isinstance(msg,str)):
+        if (msg.isascii()):
+            characters = np.frombuffer(msg.encode('ascii'),dtype='uint8')
+            codes = characters
+        else:
+            # Characters outside of the byte range are mapped to 255, which
+            # is not in the alphabet.  The full character codes are kept 
+            # for naming the unknown characters.
+            characters = np.frombuffer(msg.encode('utf-32-le'),dtype='uint32')
+            codes = np.minimum(characters,255).astype('uint8')
     else:
-        return False
+        characters = np.frombuffer(msg,dtype='uint8')
+        codes = characters
+
+    values = encode_table[codes]
+    is_unknown = (values == 255)
+    if (not is_unknown.any()):
+        if (unknown == 'count'):
+            return values, 0
+        return values
+
+    if (unknown == 'replace'):
+        values[is_unknown] = alphabet.index(replacement.upper())
+        return values
+    if (unknown == 'raise'):
+        raise ValueError(chr(characters[is_unknown][0]) + 
+                         " is not included in the current alphabet.")
+
+    values = values[~is_unknown]
+    if (unknown == 'count'):
+        return values, int(is_unknown.sum())
+    if (unknown == 'warn'):
+        removed = [chr(code) for code in np.unique(characters[is_unknown])]
+        print(int(is_unknown.sum()),"characters not included in the current alphabet were removed:",
+              ' '.join(removed))
+
+    return values
+
+
+def ExtendedGCD(a,b):
+    '''
+    ExtendedGCD(a,b)
+    
+    ExtendedGCD uses the extended Euclidean algorithm to find the greatest
+    common divisor g of a and b, together with ints s and t such that
+    s*a + t*b = g.
+
+    Parameters
+    ----------
+    a: int
+    b: int
+
+    Returns
+    -------
+    g: int
+    s: int
+    t: int
+    '''
+    a, b = int(a), int(b)
+    s0, s1 = 1, 0
+    t0, t1 = 0, 1
+    while (b != 0):
+        q = a//b
+        a, b = b, a - q*b
+        s0, s1 = s1, s0 - q*s1
+        t0, t1 = t1, t0 - q*t1
+    return a, s0, t0
+
+
+def GetHillKey(A, N = None):
+    '''
+    GetHillKey(A, N = None)
+    
+    Returns the HillKey for the encryption matrix A, mod N.  N is the length
+    of the alphabet unless another value is given.  The most recently used
+    keys are stored, so that using the same matrix again does not require
+    the determinant or inverse to be recomputed.  A HillKey may also be
+    given in place of A.
+
+    Parameters
+    ----------
+    A: NumPy array object of dimension nxn, or HillKey
+    N: optional int
+
+    Returns
+    -------
+    key: HillKey
+    '''
+    if (isinstance(A,HillKey)):
+        return A
+    if (N is None):
+        N = len(alphabet)
+    A = np.asarray(A,dtype='int64')
+    return _CachedHillKey(A.tobytes(),A.shape,N)
+
+
+@functools.lru_cache(maxsize=256)
+def _CachedHillKey(matrix_bytes,shape,N):
+    return HillKey(np.frombuffer(matrix_bytes,dtype='int64').reshape(shape),N)
 
 
 def HillCipherEncryption(msg,A):
@@ -79,47 +247,47 @@ def HillCipherEncryption(msg,A):
     Parameters
     ----------
     msg: String
-    A: NumPy array object of dimension nxn
+    A: NumPy array object of dimension nxn, or HillKey
 
     Returns
     -------
     encrypted_message: String
     '''   
-    # Check for valid encryption matrix
+    # Check for valid encryption matrix.  A HillKey is always square.
 
-    if (A.shape[0] != A.shape[1]):
+    if (not isinstance(A,HillKey) and A.shape[0] != A.shape[1]):
         print("Encryption not applied.")
         print("Encryption matrix must be square.")
         return msg
-    N = A.shape[0]
     
-    if (CheckEncryptionMatrix(A) == False):
+    key = GetHillKey(A)
+    A = key.matrix
+    N = A.shape[0]
+    if (key.valid == False):
         print("Encryption not applied.")
         print("Encryption matrix is not compatible with current alphabet.")
         return msg
     
     # Convert to numerical message
     
-    plaintext = AlphaMessage_to_NumericMessage(msg)
+    plaintext = EncodeMessage(msg,unknown='warn')
 
     # Pad message with random numbers
 
-    while(len(plaintext)%N != 0):
-        plaintext.append(random.randint(0,28))
+    padding = np.random.randint(0,len(alphabet),(-len(plaintext))%N)
+    plaintext = np.concatenate((plaintext,padding))
 
     # Form plaintext array
 
-    P = np.array(plaintext)
-    P = P.reshape((int(len(plaintext)/N),N))
+    P = plaintext.reshape((int(len(plaintext)/N),N))
     P = P.transpose()
 
     # Compute ciphertext array
     
     C = (A@P)%len(alphabet)
     C = C.transpose()
-    C = C.reshape((1,len(plaintext)))
     
-    encrypted_message = NumericMessage_to_AlphaMessage(C)
+    encrypted_message = DecodeMessage(C)
     return encrypted_message
 
 
@@ -133,56 +301,376 @@ def HillCipherDecryption(msg,A):
     Parameters
     ----------
     msg: String
-    A: NumPy array object of dimension nxn
+    A: NumPy array object of dimension nxn, or HillKey
 
     Returns
     -------
     decrypted_message: String
     '''
-    # Check for valid encryption matrix
-    if (A.shape[0] != A.shape[1]):
+    # Check for valid encryption matrix.  A HillKey is always square.
+    if (not isinstance(A,HillKey) and A.shape[0] != A.shape[1]):
         print("Encryption not applied.")
         print("Encryption matrix must be square.")
         return msg
-    N = A.shape[0]
 
-    if (CheckEncryptionMatrix(A) == False):
+    key = GetHillKey(A)
+    N = key.matrix.shape[0]
+    if (key.valid == False):
         print("Encryption not applied.")
         print("Encryption matrix is not compatible with current alphabet.")
         return msg
     
     # Convert to numerical message
     
-    ciphertext = AlphaMessage_to_NumericMessage(msg)
+    ciphertext = EncodeMessage(msg,unknown='warn')
 
     # Pad message with random numbers (should not be necessary)
 
-    while(len(ciphertext)%N != 0):
-        ciphertext.append(random.randint(0,28))
+    padding = np.random.randint(0,len(alphabet),(-len(ciphertext))%N)
+    ciphertext = np.concatenate((ciphertext,padding))
 
     # Form ciphertext array
 
-    C = np.array(ciphertext)
-    C = C.reshape((int(len(ciphertext)/N),N))
+    C = ciphertext.reshape((int(len(ciphertext)/N),N))
     C = C.transpose()
 
     # Compute plaintext array    
 
-    A_inv = ModularInverseMatrix(A)
+    A_inv = key.inverse
 
     P = (A_inv@C)%len(alphabet)
     P = P.transpose()
-    P = P.reshape((1,len(ciphertext)))
 
-    decrypted_message = NumericMessage_to_AlphaMessage(P)
+    decrypted_message = DecodeMessage(P)
     return decrypted_message
 
 
+def HillCipherBatch(messages,keys,decrypt = False):
+    '''
+    HillCipherBatch(messages,keys,decrypt = False)
+    
+    Applies Hill Cipher encryption (or decryption if decrypt is True) to a 
+    list of messages using one encryption matrix, or a stack of k matrices.
+    Each matrix is checked and, for decryption, inverted only once.  The 
+    messages are converted to a single padded array of blocks so that all 
+    of the matrix products are carried out together.
+
+    Characters not in the alphabet are dropped and each message is padded
+    with random values as in HillCipherEncryption.  If a matrix in keys is 
+    not compatible with the alphabet, the messages are returned unchanged
+    for that matrix.
+
+    Parameters
+    ----------
+    messages: list of strings
+    keys: NumPy array object of dimension nxn, or kxnxn
+    decrypt: optional bool
+
+    Returns
+    -------
+    results: NumPy array object of dimension m containing strings, or of 
+             dimension kxm if keys is kxnxn.  results[i,j] is message j 
+             with matrix i applied.
+    '''
+    single_key = (keys.ndim == 2)
+    keys = np.array(keys,dtype='int64').reshape((-1,)+keys.shape[-2:])
+    k, n = keys.shape[0], keys.shape[1]
+    if (keys.shape[1] != keys.shape[2]):
+        raise ValueError("Encryption matrix must be square.")
+    N = len(alphabet)
+    m = len(messages)
+
+    # Check each matrix once, and replace it by its inverse to decrypt
+    valid = np.zeros(k,dtype='bool')
+    for i in range(k):
+        key = GetHillKey(keys[i])
+        valid[i] = key.valid
+        if (valid[i] and decrypt):
+            keys[i] = key.inverse
+    if (not valid.all()):
+        print("Encryption not applied for incompatible matrices",
+              np.nonzero(~valid)[0].tolist(),".")
+
+    # Convert all of the messages together.  UTF-32 gives one code for 
+    # each character, so that each value can be traced to its message.
+    codes = np.frombuffer(''.join(messages).encode('utf-32-le'),dtype='uint32')
+    values = encode_table[np.minimum(codes,255)]
+    message_index = np.repeat(np.arange(m),[len(msg) for msg in messages])
+    known = (values != 255)
+    values = values[known]
+    message_index = message_index[known]
+
+    # Form an mxBxn array in which P[j] contains the blocks of message j.
+    # Messages are padded with random numbers to a multiple of n, and then 
+    # with zeros to the length of the longest message.
+    counts = np.bincount(message_index,minlength=m)
+    lengths = counts + (-counts)%n
+    starts = np.cumsum(counts) - counts
+    B = int(lengths.max())//n if m > 0 else 0
+    P = np.zeros((m,B*n),dtype='int64')
+    P[message_index,np.arange(len(values))-starts[message_index]] = values
+    column = np.arange(B*n)
+    padding = (column >= counts[:,np.newaxis])&(column < lengths[:,np.newaxis])
+    P[padding] = np.random.randint(0,N,int(padding.sum()))
+    P = P.reshape((m,B,n))
+
+    # C[i,j] contains the blocks of message j with key i applied
+    valid_keys = keys[valid]
+    C = (P[np.newaxis,:,:,:]@valid_keys.transpose(0,2,1)[:,np.newaxis,:,:])%N
+    C = C.reshape((len(valid_keys),m,B*n))
+
+    # Translate all messages for each key at once and then split the text
+    in_message = (column < lengths[:,np.newaxis])
+    ends = np.cumsum(lengths).tolist()
+    results = np.empty((k,m),dtype='object')
+    results[~valid,:] = np.array(messages,dtype='object')
+    for i, key_index in enumerate(np.nonzero(valid)[0]):
+        text = DecodeMessage(C[i][in_message])
+        results[key_index,:] = [text[end-length:end] 
+                                for end, length in zip(ends,lengths.tolist())]
+
+    if (single_key):
+        return results[0]
+    return results
+
+
+def HillCipherStream(source,A,decrypt = False,chunk_size = 65536):
+    '''
+    HillCipherStream(source,A,decrypt = False,chunk_size = 65536)
+    
+    Applies Hill Cipher encryption (or decryption if decrypt is True) to a
+    message that is read in pieces from source, which may be a file object
+    or any iterable of strings or bytes.  The result is produced one chunk
+    at a time, so that large files can be processed without holding the 
+    whole message in memory.  For example,
+
+        outfile.writelines(HillCipherStream(infile,A))
+
+    writes the encrypted contents of infile to outfile.  The encryption 
+    matrix is checked and, for decryption, inverted only once.  Characters
+    not in the alphabet are dropped, and the end of the message is padded
+    with random values as in HillCipherEncryption.
+
+    Parameters
+    ----------
+    source: file object, or iterable of strings or bytes
+    A: NumPy array object of dimension nxn, or HillKey
+    decrypt: optional bool
+    chunk_size: optional int, number of characters read at a time
+
+    Returns
+    -------
+    Generator that yields strings
+    '''
+    # Check for valid encryption matrix.  A HillKey is always square.
+    if (not isinstance(A,HillKey) and A.shape[0] != A.shape[1]):
+        raise ValueError("Encryption matrix must be square.")
+    key = GetHillKey(A)
+    if (key.valid == False):
+        raise ValueError("Encryption matrix is not compatible with current alphabet.")
+    A = key.matrix
+    n = A.shape[0]
+    N = len(alphabet)
+
+    if (decrypt):
+        A = key.inverse
+    A_transpose = np.array(A,dtype='int64').transpose()
+
+    if (hasattr(source,'read')):
+        chunks = iter(lambda: source.read(chunk_size),source.read(0))
+    else:
+        chunks = source
+
+    # Values left over from the previous chunk that do not fill a full block
+    leftover = np.zeros(0,dtype='uint8')
+
+    for chunk in chunks:
+        values = np.concatenate((leftover,EncodeMessage(chunk)))
+
+        full_length = len(values) - len(values)%n
+        leftover = values[full_length:]
+        if (full_length > 0):
+            # Each row of P is one block of the message, so P@A.T gives the
+            # transpose of the product A@P used in HillCipherEncryption
+            P = values[:full_length].reshape((-1,n))
+            C = (P@A_transpose)%N
+            yield DecodeMessage(C)
+
+    if (len(leftover) > 0):
+        # Pad message with random numbers
+        padding = np.random.randint(0,N,n-len(leftover)).astype('uint8')
+        P = np.concatenate((leftover,padding)).reshape((1,n))
+        C = (P@A_transpose)%N
+        yield DecodeMessage(C)
+
+
+class HillKey:
+    '''
+    HillKey(A, N = None)
+
+    HillKey stores an encryption matrix A together with the results needed
+    to use it, computed once when the key is created.  N is the length of
+    the alphabet unless another value is given.  Keys with the same matrix
+    and N are equal and have the same hash, so they can be used in sets 
+    and as dictionary keys.  Use GetHillKey to reuse keys that have 
+    already been created.
+
+    Parameters
+    ----------
+    A: NumPy array object of dimension nxn
+    N: optional int
+
+    Attributes
+    ----------
+    matrix: NumPy array object of dimension nxn, read only
+    N: int
+    determinant: int, exact determinant of A
+    determinant_inverse: int, inverse of the determinant mod N, or None
+    valid: bool, True if A has an inverse mod N
+    inverse: NumPy array object of dimension nxn, inverse of A mod N, 
+             or None
+    '''
+
+    def __init__(self, A, N = None):
+        if (A.shape[0] != A.shape[1]):
+            raise ValueError("Encryption matrix must be square.")
+        if (N is None):
+            N = len(alphabet)
+        self.N = N
+        self.matrix = np.array(A,dtype='int64')
+        self.matrix.flags.writeable = False
+        
+        self.determinant = lag.DeterminantIteration(self.matrix)
+        self.determinant_inverse = ModularInverse(self.determinant,N)
+        self.valid = (self.determinant_inverse is not None)
+        
+        self.inverse = None
+        if (self.valid):
+            self.inverse = ModularInverseMatrix(self.matrix,N)
+            self.inverse.flags.writeable = False
+
+    def __eq__(self, other):
+        if (not isinstance(other,HillKey)):
+            return NotImplemented
+        return (self.N == other.N and 
+                np.array_equal(self.matrix,other.matrix))
+
+    def __hash__(self):
+        return hash((self.N,self.matrix.shape,self.matrix.tobytes()))
+
+
+def KeySearch(ciphertext,n,candidates = 8,score = None,batch_size = 4096,
+              processes = None):
+    '''
+    KeySearch(ciphertext,n,candidates = 8,score = None,batch_size = 4096,
+              processes = None)
+    
+    KeySearch attempts to find the nxn encryption matrix used to produce
+    ciphertext, when the plaintext is not known and is assumed to be 
+    English.  Enough ciphertext is needed for character frequencies to be
+    meaningful, typically several hundred characters.
+
+    Each row of the decryption matrix determines one character in every 
+    block of the plaintext, so the rows can be searched separately.  All 
+    N^n possible rows are tested in batches of batch_size, using a single
+    matrix product for each batch, and scored by comparing the characters
+    they produce with english_frequencies.  The best scoring rows are then
+    arranged into decryption matrices, and each arrangement that has an 
+    inverse mod N is scored on the full decrypted text.  By default this 
+    score counts the words in common_words.  The search is practical for
+    n up to about 4.  If processes is given, the rows are tested in that
+    many parallel processes.
+
+    Parameters
+    ----------
+    ciphertext: String
+    n: int
+    candidates: optional int, number of best scoring rows to arrange
+    score: optional function that accepts a string and returns a number
+    batch_size: optional int
+    processes: optional int
+
+    Returns
+    -------
+    A: NumPy array object of dimension nxn, or None
+    '''
+    N = len(alphabet)
+    C = EncodeMessage(ciphertext).astype('int64')
+    C = C[:len(C) - len(C)%n].reshape((-1,n)).transpose()
+
+    frequencies = np.array([english_frequencies.get(letter,0) 
+                            for letter in alphabet])
+    log_frequencies = np.log(np.maximum(frequencies,1e-5))
+    if (score is None):
+        score = lambda text: sum(text.split().count(word) 
+                                 for word in common_words)
+
+    # Test all possible rows, split into ranges of indices
+    total = N**n
+    if (processes is not None and processes > 1):
+        bounds = np.linspace(0,total,processes+1).astype('int64')
+        tasks = [(bounds[i],bounds[i+1],C,log_frequencies,candidates,
+                  batch_size) for i in range(processes)]
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.starmap(_ScoreKeyRows,tasks)
+    else:
+        results = [_ScoreKeyRows(0,total,C,log_frequencies,candidates,
+                                 batch_size)]
+    rows = np.vstack([result[0] for result in results])
+    row_scores = np.concatenate([result[1] for result in results])
+    best = np.argsort(row_scores)[::-1][:candidates]
+    rows = rows[best]
+
+    # Try each arrangement of n of the best rows as a decryption matrix
+    plaintext_rows = (rows@C)%N
+    best_score = None
+    best_D = None
+    for arrangement in itertools.permutations(range(len(rows)),n):
+        D = rows[list(arrangement)]
+        if (np.gcd(lag.DeterminantIteration(D),N) != 1):
+            continue
+        text = DecodeMessage(plaintext_rows[list(arrangement)].transpose())
+        text_score = score(text)
+        if (best_score is None or text_score > best_score):
+            best_score = text_score
+            best_D = D
+
+    if (best_D is None):
+        print("No invertible decryption matrix was found.")
+        return None
+
+    A = ModularInverseMatrix(best_D)
+    return A
+
+
+def _ScoreKeyRows(start,stop,C,log_frequencies,candidates,batch_size):
+    # Score the rows with indices start to stop-1, where the digits of the
+    # index in base N are the entries of the row, and keep the best ones.
+    N = len(log_frequencies)
+    n = C.shape[0]
+    powers = N**np.arange(n,dtype='int64')
+    best_rows = np.zeros((0,n),dtype='int64')
+    best_scores = np.zeros(0)
+    for batch_start in range(start,stop,batch_size):
+        indices = np.arange(batch_start,min(batch_start+batch_size,stop))
+        rows = (indices[:,np.newaxis]//powers)%N
+        scores = log_frequencies[(rows@C)%N].sum(axis=1)
+        rows = np.vstack((best_rows,rows))
+        scores = np.concatenate((best_scores,scores))
+        if (len(scores) > candidates):
+            keep = np.argpartition(scores,-candidates)[-candidates:]
+            rows = rows[keep]
+            scores = scores[keep]
+        best_rows, best_scores = rows, scores
+    return best_rows, best_scores
+
+
 def ModularInverse(a,N):
     '''
     ModularInverse(a,N)
     
-    ModularInverse finds the inverse of a, mod N, by direct search.
+    ModularInverse finds the inverse of a, mod N, using the extended 
+    Euclidean algorithm.  If a has no inverse mod N, None is returned.
 
     Parameters
     ----------
@@ -193,23 +681,26 @@ def ModularInverse(a,N):
     -------
     i: int
     '''
-    for i in range(N):
-        if (i*a)%N == 1:
-            return i
+    g, s, t = ExtendedGCD(int(a)%N,N)
+    if (g != 1):
+        return None
+    return s%N
 
 
-def ModularInverseMatrix(A):
+def ModularInverseMatrix(A, N = None):
     '''
-    ModularInverseMatrix(A)
+    ModularInverseMatrix(A, N = None)
     
-    ModularInverseMatrix computes the invers of a matrix A inverse mod N,
-    with N being the length of the alphabet contained in this module. The 
-    inverse matrix is computed with determinant formula and modular inverse 
-    of det A.
+    ModularInverseMatrix computes the inverse of a matrix A mod N, with N 
+    being the length of the alphabet contained in this module unless 
+    another value is given.  The inverse matrix is computed by Gauss-Jordan
+    elimination on [A|I], with all arithmetic carried out mod N, using 
+    ModularRowReduction.  If A has no inverse mod N, None is returned.
 
     Parameters
     ----------
     A: NumPy array object of dimension nxn
+    N: optional int
 
     Returns
     -------
@@ -221,32 +712,91 @@ def ModularInverseMatrix(A):
         return
     
     n = A.shape[0]  # n is number of rows and columns in A
-    
-    A_inv = np.zeros((n,n),dtype='int')
-
-    det_A = lag.DeterminantIteration(A)
-    inv_det_A = ModularInverse(det_A,len(alphabet))
-
-    for i in range(n):
-        for j in range(n):
-            # Extract the Minor matrix
-            Minor = []
-            for k in range(n):
-                if (k != i):
-                    row = []
-                    for l in range(n):
-                        if (l != j):
-                            row.append(A[k,l])
-                    Minor.append(row)
-            Minor_array = np.array(Minor)
-
-            # Compute the (i,j) cofactor
-            cofactor = (-1)**(i+j)*lag.DeterminantIteration(Minor_array)
-            A_inv[j,i] = cofactor*inv_det_A
+    if (N is None):
+        N = len(alphabet)
+
+    R = ModularRowReduction(np.hstack((np.array(A,dtype='int64'),
+                                       np.eye(n,dtype='int64'))),N,n)
+    if (R is None):
+        print("Matrix does not have an inverse mod",N,".")
+        return None
+
+    A_inv = R[:,n:]
 
     return A_inv
 
 
+def ModularRowReduction(A, N = None, columns = None):
+    '''
+    ModularRowReduction(A, N = None, columns = None)
+    
+    ModularRowReduction carries out Gauss-Jordan elimination on the mxk 
+    array A, with all arithmetic carried out mod N.  N is the length of the
+    alphabet unless another value is given.  Elimination is carried out in
+    the first columns columns (all columns if not given), which must each 
+    contain a pivot that has an inverse mod N.  The result has the identity
+    matrix in its first columns rows and columns and zeros below.  This 
+    solves the system with coefficients in the first columns columns, and
+    right hand sides in the rest.  If a pivot cannot be found, None is 
+    returned.
+    
+    If N is not prime, a column may not contain any entry that has an 
+    inverse mod N.  In that case rows are combined using the extended 
+    Euclidean algorithm until the pivot is the gcd of the column entries.
+
+    Parameters
+    ----------
+    A: NumPy array object of dimension mxk
+    N: optional int
+    columns: optional int, no larger than m
+
+    Returns
+    -------
+    R: NumPy array object of dimension mxk
+    '''
+    if (N is None):
+        N = len(alphabet)
+    m = A.shape[0]
+    if (columns is None):
+        columns = A.shape[1]
+    if (columns > m):
+        return None
+
+    M = np.array(A,dtype='int64')%N
+
+    for k in range(columns):
+        # Look for an entry in column k that has an inverse mod N
+        candidates = np.nonzero(np.gcd(M[k:,k],N) == 1)[0]
+
+        if (len(candidates) > 0):
+            pivot_row = k + candidates[0]
+        else:
+            # Combine row k with each row below so that the gcd of the
+            # entries in column k collects in row k and the rest become zero.
+            # Each combination has determinant 1 and can be undone mod N.
+            for i in range(k+1,m):
+                if (M[i,k] != 0):
+                    g, s, t = ExtendedGCD(M[k,k],M[i,k])
+                    row_k = (s*M[k] + t*M[i])%N
+                    M[i] = ((M[k,k]//g)*M[i] - (M[i,k]//g)*M[k])%N
+                    M[k] = row_k
+            pivot_row = k
+
+        if (np.gcd(M[pivot_row,k],N) != 1):
+            return None
+
+        if (pivot_row != k):
+            M[[k,pivot_row]] = M[[pivot_row,k]]
+
+        # Scale the pivot to one, then clear the rest of column k
+        M[k] = (M[k]*ModularInverse(M[k,k],N))%N
+        pivot_row = M[k].copy()
+        M = (M - np.outer(M[:,k],pivot_row))%N
+        M[k] = pivot_row
+
+    return M
+
+
 def NumericMessage_to_AlphaMessage(msg):
     ''' 
     NumericMessage_to_AlphaMessage(msg)
@@ -262,11 +812,52 @@ def NumericMessage_to_AlphaMessage(msg):
     -------
     D: String
     '''
-    N = msg.shape[1]
+    D = DecodeMessage(msg[0,:])
+
+    return D
+
+
+def RecoverKey(plaintext,ciphertext,n,N = None):
+    '''
+    RecoverKey(plaintext,ciphertext,n,N = None)
     
-    text = ''
+    RecoverKey finds the nxn encryption matrix A used to produce ciphertext
+    from plaintext, when both are known.  If P contains the plaintext 
+    blocks as rows and C the ciphertext blocks, then P A^T = C mod N, 
+    which is solved for A^T using ModularRowReduction.  The plaintext must
+    contain n blocks whose matrix has an inverse mod N.  None is returned
+    if the key cannot be determined or does not produce the ciphertext.
 
-    for i in range(N):
-        text = text + alphabet[msg[0,i]%len(alphabet)]
+    Parameters
+    ----------
+    plaintext: String
+    ciphertext: String
+    n: int
+    N: optional int
 
-    return text
+    Returns
+    -------
+    A: NumPy array object of dimension nxn, or None
+    '''
+    if (N is None):
+        N = len(alphabet)
+
+    P = EncodeMessage(plaintext).astype('int64')
+    C = EncodeMessage(ciphertext).astype('int64')
+    length = min(len(P),len(C))
+    length -= length%n
+    P = P[:length].reshape((-1,n))
+    C = C[:length].reshape((-1,n))
+
+    R = ModularRowReduction(np.hstack((P,C)),N,n)
+    if (R is None):
+        print("The plaintext does not determine the encryption matrix.")
+        return None
+    A = R[:n,n:].transpose()
+
+    # Check that A produces all of the ciphertext blocks
+    if (not np.array_equal((P@A.transpose())%N,C)):
+        print("The plaintext and ciphertext are not consistent with a single key.")
+        return None
+
+    return A
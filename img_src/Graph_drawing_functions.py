@@ -5,16 +5,22 @@ Created on Tue Nov 17 10:22:19 2020
 @author: Ben Vanderlei
 """
 
+import numpy as np
 import matplotlib.pyplot as plt
 import networkx as nx
 
-def DrawGraph(A, pos = None):
+def DrawGraph(A, pos = None, weighted = False):
     '''
-    Draws a directed graph based on adjacency matrix A.
+    Draws a directed graph based on adjacency matrix A.  A may be a NumPy
+    array, a SciPy sparse matrix, or a list of edges (see GraphEdges).  
+    Any nonzero entry of A gives an edge.  If weighted is True, each edge 
+    is labeled with its weight.
 
     Parameters
     ----------
-    A : NumPy array object.
+    A : NumPy array object, SciPy sparse matrix, or list of edges
+    pos: Optional dictionary to specify node coordinates
+    weighted: Optional bool
 
     Returns
     -------
@@ -24,31 +30,65 @@ def DrawGraph(A, pos = None):
     plt.figure(figsize=(6,6))
     G = nx.DiGraph()
     
-    N = A.shape[0]
-    edge_list = []
-    
-    for i in range(N):
-        for j in range(N):
-            if(A[i,j] == 1):
-                edge_list.append((i,j))
-    
-    G.add_edges_from(edge_list)
-    if (pos == None):
+    rows, columns, weights = GraphEdges(A)
+    G.add_weighted_edges_from(zip(rows.tolist(),columns.tolist(),
+                                  weights.tolist()))
+    if (pos is None):
         pos = nx.spring_layout(G)
     
     options = {"with_labels": True,"font_size":20}
     nx.draw(G, pos,connectionstyle='arc3, rad = 0.1',arrowsize=30,**options)
+    if (weighted):
+        labels = nx.get_edge_attributes(G,'weight')
+        nx.draw_networkx_edge_labels(G,pos,edge_labels=labels,
+                                     connectionstyle='arc3, rad = 0.1')
     return pos
 
+def GraphEdges(A):
+    '''
+    GraphEdges(A)
+    
+    Finds the edges of the directed graph with adjacency matrix A.  There 
+    is an edge from node i to node j for each nonzero entry A[i,j], and 
+    the entry is used as the weight of the edge.  A may be a NumPy array, 
+    a SciPy sparse matrix, or a list of edges given as pairs (i,j) or as 
+    triples (i,j,weight).
+
+    Parameters
+    ----------
+    A : NumPy array object, SciPy sparse matrix, or list of tuples
+
+    Returns
+    -------
+    rows : NumPy array object of dimension E containing ints
+    columns : NumPy array object of dimension E containing ints
+    weights : NumPy array object of dimension E
+    '''
+    if (hasattr(A,'tocoo')):
+        A = A.tocoo()
+        nonzero = (A.data != 0)
+        return A.row[nonzero], A.col[nonzero], A.data[nonzero]
+
+    if (isinstance(A,np.ndarray)):
+        rows, columns = np.nonzero(A)
+        return rows, columns, A[rows,columns]
+
+    edges = list(A)
+    rows = np.array([edge[0] for edge in edges],dtype='int')
+    columns = np.array([edge[1] for edge in edges],dtype='int')
+    weights = np.array([edge[2] if len(edge) > 2 else 1 for edge in edges])
+    return rows, columns, weights
+
 def HighlightSubgraph(A,pos,subgraph):
     '''
     Draws directed graph based on adjacency matrix A, with node positions pos,
     then colors a subgraph containing nodes in nodelist and edges connecting
-    connecting nodes in nodelist    
+    connecting nodes in nodelist.  A may be a NumPy array, a SciPy sparse 
+    matrix, or a list of edges (see GraphEdges).
 
     Parameters
     ----------
-    A : NumPy array object
+    A : NumPy array object, SciPy sparse matrix, or list of edges
     
     pos : dictionary of node positions
     
@@ -62,19 +102,12 @@ def HighlightSubgraph(A,pos,subgraph):
     plt.figure(figsize=(8,8))
     G = nx.DiGraph()
     
-    N = A.shape[0]
-    edge_list = []
-    subgraph_edges = []
-    
-    for i in range(N):
-        for j in range(N):
-            if(A[i,j] == 1):
-                edge_list.append((i,j))
- 
-    for edge in edge_list:           
-        if (edge[0] in subgraph and edge[1] in subgraph):
-                    subgraph_edges.append(edge)
-    
+    rows, columns, weights = GraphEdges(A)
+    edge_list = list(zip(rows.tolist(),columns.tolist()))
+
+    # An edge is in the subgraph if both of its nodes are in the subgraph
+    in_subgraph = np.isin(rows,list(subgraph)) & np.isin(columns,list(subgraph))
+    subgraph_edges = [edge_list[k] for k in np.flatnonzero(in_subgraph)]
 
     G.add_edges_from(edge_list)
     
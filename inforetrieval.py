@@ -0,0 +1,430 @@
+# -*- coding: utf-8 -*-
+"""
+The purpose of this module is to contain the code that is used for the
+Information Retrieval application in the Jupyter Guide to Linear Algebra.
+
+Documents are represented as vectors of word counts, and a search returns
+the documents whose vectors make the smallest angle with the vector that
+represents the search.  Since most words do not appear in most documents,
+the matrix of document vectors is stored as a SciPy sparse matrix.
+"""
+import os
+import re
+import numpy as np
+import scipy.sparse as sparse
+
+word_pattern = re.compile(r"[a-z0-9]+")
+
+def Tokenize(text):
+    '''
+    Tokenize(text)
+
+    Splits a string into a list of lower case words.  Any characters other
+    than letters and digits separate the words.
+
+    Parameters
+    ----------
+    text : String
+
+    Returns
+    -------
+    words: List containing strings
+    '''
+    return word_pattern.findall(text.lower())
+
+
+def TopResults(scores, k):
+    '''
+    TopResults(scores, k)
+
+    Finds the k largest entries in each row of scores, in order from
+    largest to smallest.  The k largest entries are first separated from
+    the rest with argpartition, so that only those k need to be sorted.
+
+    Parameters
+    ----------
+    scores : NumPy array object of dimension (N,) or bxN
+    k : int
+
+    Returns
+    -------
+    indices : NumPy array object of dimension (k,) or bxk
+    top_scores : NumPy array object of dimension (k,) or bxk
+    '''
+    scores = np.asarray(scores)
+    N = scores.shape[-1]
+    k = min(k,N)
+    if (k == 0):
+        empty = np.zeros(scores.shape[:-1]+(0,))
+        return empty.astype('int64'), empty
+
+    if (k < N):
+        indices = np.argpartition(-scores,k-1,axis=-1)[...,:k]
+    else:
+        indices = np.broadcast_to(np.arange(N),scores.shape).copy()
+    top_scores = np.take_along_axis(scores,indices,axis=-1)
+
+    order = np.argsort(-top_scores,axis=-1,kind='stable')
+    indices = np.take_along_axis(indices,order,axis=-1)
+    top_scores = np.take_along_axis(top_scores,order,axis=-1)
+
+    return indices, top_scores
+
+
+class DocumentIndex:
+    '''
+    DocumentIndex(documents, keywords = None, binary = False)
+
+    DocumentIndex builds the matrix of document vectors for a list of
+    documents and answers searches using the cosine of the angle between
+    the search vector and each document vector.
+
+    The matrix is stored with one row for each keyword and one column for
+    each document, in CSR format.  Each column is scaled to unit length
+    when the index is built, so that a search requires only the rows for
+    the keywords in the search, and the cosines are found with a single
+    sparse matrix product.
+
+    If keywords is not given, every word that appears in the documents is
+    a keyword.  If binary is True, entries record only whether a keyword
+    appears in a document, rather than the number of times it appears.
+    An index can also be built directly from a matrix of document vectors
+    with DocumentIndex.from_matrix.  An index can be saved with save, and
+    opened again with DocumentIndex.load without being rebuilt.
+
+    Example
+    -------
+    index = DocumentIndex(documents)
+    documents, scores = index.search("linear algebra",k=5)
+
+    Parameters
+    ----------
+    documents : list of strings
+    keywords : optional list of strings
+    binary : optional bool
+
+    Attributes
+    ----------
+    keywords : list of strings (NumPy array of strings for a loaded index)
+    vocabulary : dictionary giving the row of each keyword, or None for an
+                 index opened with load, which finds keywords by binary 
+                 search in a sorted array instead
+    term_document : SciPy CSR matrix of dimension nxN, whose columns are
+                    the unit document vectors for the N documents
+    norms : NumPy array object of dimension N, the magnitudes of the 
+            document vectors before scaling
+    '''
+
+    def __init__(self, documents, keywords = None, binary = False):
+        fixed_keywords = (keywords is not None)
+        if (fixed_keywords):
+            keywords = [word.lower() for word in keywords]
+        else:
+            keywords = []
+        vocabulary = {word:i for i, word in enumerate(keywords)}
+
+        # Record the row of each word, and the column of each document
+        rows = []
+        columns = []
+        for j, document in enumerate(documents):
+            for word in Tokenize(document):
+                i = vocabulary.get(word)
+                if (i is None):
+                    if (fixed_keywords):
+                        continue
+                    i = len(keywords)
+                    vocabulary[word] = i
+                    keywords.append(word)
+                rows.append(i)
+                columns.append(j)
+
+        counts = sparse.coo_matrix((np.ones(len(rows)),(rows,columns)),
+                                   shape=(len(keywords),len(documents)))
+        self._build(counts.tocsr(),keywords,binary)
+
+    @classmethod
+    def from_matrix(cls, D, keywords = None, binary = False):
+        '''
+        from_matrix(D, keywords = None, binary = False)
+
+        Builds an index from an Nxn matrix D that has one row for each
+        document and one column for each keyword, as in the Information
+        Retrieval examples.  D may be a NumPy array or a SciPy sparse
+        matrix.
+
+        Parameters
+        ----------
+        D : NumPy array object or SciPy sparse matrix of dimension Nxn
+        keywords : optional list of n strings
+        binary : optional bool
+
+        Returns
+        -------
+        index : DocumentIndex
+        '''
+        index = cls.__new__(cls)
+        if (keywords is None):
+            keywords = [str(i) for i in range(D.shape[1])]
+        index._build(sparse.csr_matrix(D.transpose(),dtype='float64'),
+                     [word.lower() for word in keywords],binary)
+        return index
+
+    def _build(self, counts, keywords, binary):
+        counts.sum_duplicates()
+        if (binary):
+            counts.data[:] = 1
+        self.keywords = keywords
+        self.vocabulary = {word:i for i, word in enumerate(keywords)}
+
+        # Scale each column (document) to unit length
+        norms = np.sqrt(np.asarray(counts.multiply(counts).sum(axis=0))[0])
+        scale = np.zeros_like(norms)
+        scale[norms != 0] = 1/norms[norms != 0]
+        self.term_document = sparse.csr_matrix(counts@sparse.diags(scale))
+        self.norms = norms
+
+    def save(self, directory):
+        '''
+        save(directory)
+
+        Saves the index as NumPy .npy files in directory, which is created
+        if needed.  The keywords, the three arrays that make up the CSR 
+        matrix, and the document norms are each stored in a separate file
+        so that they can be memory mapped by DocumentIndex.load.  The 
+        keywords are also stored in sorted order, together with their rows,
+        so that they can be looked up without building a dictionary.
+
+        Parameters
+        ----------
+        directory : String
+        '''
+        os.makedirs(directory,exist_ok=True)
+        keywords = np.array(self.keywords,dtype='str')
+        order = np.argsort(keywords,kind='stable')
+        np.save(os.path.join(directory,'keywords.npy'),keywords)
+        np.save(os.path.join(directory,'sorted_keywords.npy'),keywords[order])
+        np.save(os.path.join(directory,'sorted_rows.npy'),order)
+        np.save(os.path.join(directory,'data.npy'),self.term_document.data)
+        np.save(os.path.join(directory,'indices.npy'),
+                self.term_document.indices)
+        np.save(os.path.join(directory,'indptr.npy'),
+                self.term_document.indptr)
+        np.save(os.path.join(directory,'norms.npy'),self.norms)
+
+    @classmethod
+    def load(cls, directory, mmap = True):
+        '''
+        load(directory, mmap = True)
+
+        Opens an index saved with save.  If mmap is True, the arrays, 
+        including the keywords, are memory mapped in read only mode rather
+        than read into memory.  Searches can begin immediately, data is 
+        read from the files only as it is needed, and processes that open 
+        the same index share a single copy of the data.  Keywords are found
+        by binary search in the sorted keyword array.
+
+        Parameters
+        ----------
+        directory : String
+        mmap : optional bool
+
+        Returns
+        -------
+        index : DocumentIndex
+        '''
+        mmap_mode = 'r' if mmap else None
+        arrays = {}
+        for name in ['keywords','sorted_keywords','sorted_rows',
+                     'data','indices','indptr','norms']:
+            arrays[name] = np.load(os.path.join(directory,name+'.npy'),
+                                   mmap_mode=mmap_mode)
+        keywords = arrays['keywords']
+
+        index = cls.__new__(cls)
+        index.keywords = keywords
+        index.vocabulary = None
+        index._sorted_keywords = arrays['sorted_keywords']
+        index._sorted_rows = arrays['sorted_rows']
+        index.norms = arrays['norms']
+        index.term_document = sparse.csr_matrix((arrays['data'],
+                                                 arrays['indices'],
+                                                 arrays['indptr']),
+                                                shape=(len(keywords),
+                                                       len(index.norms)),
+                                                copy=False)
+        return index
+
+    def __len__(self):
+        return self.term_document.shape[1]
+
+    def _keyword_rows(self, words):
+        # Return the row of each word, or -1 for words that are not keywords
+        words = [word.lower() for word in words]
+        if (self.vocabulary is not None):
+            return np.array([self.vocabulary.get(word,-1) for word in words],
+                            dtype='int64')
+
+        rows = np.full(len(words),-1,dtype='int64')
+        n = len(self._sorted_keywords)
+        if (n == 0 or len(words) == 0):
+            return rows
+        positions = np.minimum(np.searchsorted(self._sorted_keywords,words),n-1)
+        found = (self._sorted_keywords[positions] == np.array(words))
+        rows[found] = self._sorted_rows[positions[found]]
+        return rows
+
+    def query_vector(self, query):
+        '''
+        query_vector(query)
+
+        Returns the unit search vector for query as a sparse 1xn matrix.
+        query may be a string, a list of keywords, or a NumPy array of
+        length n.  Words that are not keywords are ignored.
+
+        Parameters
+        ----------
+        query : String, list of strings, or NumPy array object
+
+        Returns
+        -------
+        Q : SciPy CSR matrix of dimension 1xn
+        '''
+        return self.query_matrix([query])
+
+    def query_matrix(self, queries):
+        '''
+        query_matrix(queries)
+
+        Returns the unit search vectors for a list of queries as the rows
+        of a sparse bxn matrix.  See query_vector.
+
+        Parameters
+        ----------
+        queries : list of strings, lists of strings, or NumPy arrays
+
+        Returns
+        -------
+        Q : SciPy CSR matrix of dimension bxn
+        '''
+        n = len(self.keywords)
+        rows = []
+        columns = []
+        values = []
+        for q, query in enumerate(queries):
+            if (isinstance(query,str)):
+                query = Tokenize(query)
+            if (isinstance(query,np.ndarray)):
+                query = query.reshape(-1)
+                nonzero = np.flatnonzero(query)
+                columns.extend(nonzero.tolist())
+                values.extend(query[nonzero].tolist())
+                rows.extend([q]*len(nonzero))
+            else:
+                found = self._keyword_rows(query)
+                found = found[found >= 0]
+                columns.extend(found.tolist())
+                values.extend([1.]*len(found))
+                rows.extend([q]*len(found))
+
+        Q = sparse.coo_matrix((values,(rows,columns)),
+                              shape=(len(queries),n)).tocsr()
+        Q.sum_duplicates()
+        norms = np.sqrt(np.asarray(Q.multiply(Q).sum(axis=1)).reshape(-1))
+        scale = np.zeros_like(norms)
+        scale[norms != 0] = 1/norms[norms != 0]
+        return sparse.csr_matrix(sparse.diags(scale)@Q)
+
+    def scores(self, query):
+        '''
+        scores(query)
+
+        Returns the cosine of the angle between the search vector for query
+        and every document vector.  Only the rows of the index for the
+        keywords in the query are used.
+
+        Parameters
+        ----------
+        query : String, list of strings, or NumPy array object
+
+        Returns
+        -------
+        scores : NumPy array object of dimension N
+        '''
+        Q = self.query_vector(query)
+        terms = Q.indices
+        weights = Q.data
+        if (len(terms) == 0):
+            return np.zeros(len(self))
+        scores = self.term_document[terms].transpose()@weights
+        return np.asarray(scores).reshape(-1)
+
+    def search(self, query, k = 10):
+        '''
+        search(query, k = 10)
+
+        Returns the k documents whose vectors are closest in angle to the
+        search vector for query, together with the cosines of the angles.
+
+        Parameters
+        ----------
+        query : String, list of strings, or NumPy array object
+        k : optional int
+
+        Returns
+        -------
+        documents : NumPy array object of dimension k containing ints
+        scores : NumPy array object of dimension k
+        '''
+        return TopResults(self.scores(query),k)
+
+    def search_batch(self, queries, k = 10, chunk_size = 1024):
+        '''
+        search_batch(queries, k = 10, chunk_size = 1024)
+
+        Carries out a search for each query in the list queries.  The
+        queries are handled chunk_size at a time, each chunk with a single
+        sparse matrix product.  The product is kept sparse, and the k 
+        largest scores are selected from the stored entries of each row, so 
+        the memory needed does not grow with the number of documents times 
+        the number of queries.
+
+        Parameters
+        ----------
+        queries : list of strings, lists of strings, or NumPy arrays
+        k : optional int
+        chunk_size : optional int
+
+        Returns
+        -------
+        documents : NumPy array object of dimension bxk containing ints
+        scores : NumPy array object of dimension bxk
+        '''
+        N = len(self)
+        k = min(k,N)
+        documents = np.zeros((len(queries),k),dtype='int64')
+        scores = np.zeros((len(queries),k))
+
+        for start in range(0,len(queries),chunk_size):
+            Q = self.query_matrix(queries[start:start+chunk_size])
+            S = sparse.csr_matrix(Q@self.term_document)
+            for q in range(S.shape[0]):
+                row = slice(S.indptr[q],S.indptr[q+1])
+                documents[start+q], scores[start+q] = \
+                    _TopSparseRow(S.indices[row],S.data[row],N,k)
+
+        return documents, scores
+
+
+def _TopSparseRow(indices, values, N, k):
+    # Find the k largest scores in a row of N scores, where only the scores
+    # at indices are stored and all others are zero.  If fewer than k scores
+    # are stored, documents with score zero are added with the lowest
+    # indices that are not stored.
+    if (len(indices) < N):
+        stored = np.zeros(min(N,len(indices)+k),dtype='bool')
+        stored[indices[indices < len(stored)]] = True
+        zeros = np.flatnonzero(~stored)[:k]
+        indices = np.concatenate((indices,zeros))
+        values = np.concatenate((values,np.zeros(len(zeros))))
+    top, top_scores = TopResults(values,k)
+    return indices[top], top_scores
@@ -16,63 +16,260 @@ Functions that have been tested have BSV in docstring.
 
 import math
 import numpy as np
+import scipy.linalg as sla
+import scipy.sparse as sparse
+import scipy.sparse.linalg as spla
 import networkx as nx
 import matplotlib.pyplot as plt
 
-def BackSubstitution(U,Y):
+def ApplyHouseholder(H,tau,B,transpose = False,block_size = 32):
     '''
-    BackSubstitution(U,Y)
+    ApplyHouseholder(H,tau,B,transpose = False,block_size = 32)
+
+    ApplyHouseholder computes QB, or Q^TB if transpose is True, where Q is
+    given by the Householder reflections H and tau returned by 
+    QRFactorization(A,method='householder',implicit=True).  Q is never 
+    formed, and the reflections are applied to B in blocks using matrix 
+    products.
+
+    Parameters
+    ----------
+    H : NumPy array object of dimension mxn
+    tau : NumPy array object of dimension n
+    B : NumPy array object of dimension mxk (or (m,))
+    transpose : optional bool
+    block_size : optional int
+
+    Returns
+    -------
+    C : NumPy array object of dimension mxk (or (m,))
+    '''
+    n = H.shape[1]
+    C = np.array(B,dtype='float64')
+    C_2d = C.reshape((C.shape[0],-1))
+
+    blocks = list(range(0,n,block_size))
+    if (not transpose):
+        blocks.reverse()
+    
+    # Q = H_0 H_1 ... H_(n-1), and each block of reflections is I - VTV^T
+    for k in blocks:
+        k_end = min(k+block_size,n)
+        V, T = _HouseholderBlock(H,tau,k,k_end)
+        if (transpose):
+            T = T.transpose()
+        C_2d[k:] -= V@(T@(V.transpose()@C_2d[k:]))
+
+    return C
+
+
+def BackSubstitution(U,Y,unit_diagonal = False,transpose = False,out = None):
+    '''
+    BackSubstitution(U,Y,unit_diagonal = False,transpose = False,out = None)
     (BSV)
     
     BackSubstitution performs back substitution to find the solution to a
     square upper triangular system UX = Y.  There is no error checking to
-    ensure that U is of full rank.
+    ensure that U is of full rank.  Only entries on and above the diagonal
+    of U are used.
+
+    Y may contain k columns, in which case the k systems are solved 
+    together.  The rows are processed in blocks, and the effect of each 
+    block on the rows above it is removed with a single matrix product.
+
+    If unit_diagonal is True, the diagonal entries of U are taken to be 1.
+    If transpose is True, the system U^TX = Y is solved instead.  If out is
+    given, the solution is stored in that array (which may be Y itself) 
+    rather than in a new array.
 
     Parameters
     ----------
     U : NumPy array object of dimension mxm
-    Y : NumPy array object of dimension mx1
+    Y : NumPy array object of dimension mx1, (m,), or mxk
+    unit_diagonal : optional bool
+    transpose : optional bool
+    out : optional NumPy array object of dimension mx1 or mxk
 
     Returns
     -------
-    X : NumPy array object of dimension mx1
+    X : NumPy array object of dimension mx1 (mxk if Y is mxk)
     '''
+    if (transpose):
+        return _TriangularSolve(U.transpose(),Y,True,unit_diagonal,out)
+    return _TriangularSolve(U,Y,False,unit_diagonal,out)
+
+def _TriangularSolve(T,Y,lower,unit_diagonal,out,block_size = 64):
+    # Solve TX = Y where T is lower or upper triangular.  Within each block
+    # of rows, each entry is found from a dot product with the entries
+    # already found in the block.  The block is then removed from the
+    # remaining rows with a matrix product.
+    m = T.shape[0]
+    if (out is None):
+        complex_entries = np.iscomplexobj(T) or np.iscomplexobj(Y)
+        dtype = 'complex128' if complex_entries else 'float64'
+        X = np.array(Y,dtype=dtype).reshape((m,-1))
+    else:
+        X = out.reshape((m,-1))
+        X[...] = np.reshape(Y,(m,-1))
 
-    m = U.shape[0]  # m is number of rows and columns in U
-    X = np.zeros((m,1))
-    
-    for i in range(m-1,-1,-1):  # Calculate entries backward from m-1 to 0
-        X[i] = Y[i]
-        for j in range(i+1,m):
-            X[i] -= U[i][j]*X[j]
-        if (U[i][i] != 0):
-            X[i] /= U[i][i]
+    if (lower):
+        blocks = [(k,min(k+block_size,m)) for k in range(0,m,block_size)]
+    else:
+        blocks = [(max(k-block_size,0),k) for k in range(m,0,-block_size)]
+
+    for (k,k_end) in blocks:
+        rows = range(k,k_end) if lower else range(k_end-1,k-1,-1)
+        for i in rows:
+            if (lower):
+                X[i] -= T[i,k:i]@X[k:i]
+            else:
+                X[i] -= T[i,i+1:k_end]@X[i+1:k_end]
+            if (not unit_diagonal):
+                if (T[i,i] != 0):
+                    X[i] /= T[i,i]
+                else:
+                    print("Zero entry found in pivot position",i,".")
+        if (lower):
+            X[k_end:] -= T[k_end:,k:k_end]@X[k:k_end]
         else:
-            print("Zero entry found in U pivot position",i,".")
+            X[:k] -= T[:k,k:k_end]@X[k:k_end]
+
+    if (out is not None):
+        return out
     return X
 
-def DeterminantIteration(A):
+def ConditionNumber(A):
+    '''
+    ConditionNumber(A)
+
+    ConditionNumber computes the condition number of the nxn matrix A, 
+    using the norm given by the largest column sum of absolute values.  
+    The condition number measures how much errors in B can be magnified 
+    in the solution to AX = B.  Roughly, a condition number of 10^k means 
+    that k digits of accuracy may be lost.  If A is singular, inf is 
+    returned.
+
+    Parameters
+    ----------
+    A: NumPy array object of dimension nxn
+
+    Returns
+    -------
+    condition: float
+    '''
+    # Check shape of A
+    if (A.shape[0] != A.shape[1]):
+        print("ConditionNumber accepts only square arrays.")
+        return None
+    n = A.shape[0]  # n is number of rows and columns in A
+
+    S = Solver(A)
+    if (S.singular):
+        return np.inf
+
+    A_inv = S.solve(np.eye(n))
+    return _ConditionFromInverse(A,A_inv)
+
+def _ConditionFromInverse(A,A_inv):
+    # The condition number of A in the norm given by the largest column
+    # sum of absolute values, when the inverse of A is already known.
+    return np.abs(A).sum(axis=0).max()*np.abs(A_inv).sum(axis=0).max()
+
+
+def DeterminantIteration(A, method = None):
     ''' 
-    DeterminantIteration(A)
+    DeterminantIteration(A, method = None)
     
-    DeterminantIteration computes the determinant of an nxn A matrix
-    by using the recursive formula.
+    DeterminantIteration computes the determinant of an nxn A matrix.
+    Three methods are available.
+
+    'cofactor' uses the recursive cofactor expansion along the first row.
+    This is the formula developed in the guide, but the number of steps
+    grows like n! and it is only practical for small matrices.
+
+    'elimination' reduces A to upper triangular form using LUFactorization
+    and multiplies the diagonal entries, changing the sign for each row 
+    swap.  The number of steps grows like n^3.
+
+    'bareiss' uses fraction-free elimination, in which every division is
+    exact, so that the determinant of an integer matrix is computed exactly
+    as a Python int.  A ValueError is raised if A is not an array of 
+    integers.
+
+    If method is not given, 'bareiss' is used for arrays of integers and 
+    'elimination' is used otherwise.
 
     Parameters
     ----------
     A: NumPy array object of dimension nxn
+    method: optional string, 'elimination', 'bareiss', or 'cofactor'
     
     Returns
     -------
-    D: int
+    D: int or float
     '''
     # Check shape of A
     if (A.shape[0] != A.shape[1]):
         print("Determinant only defined for square arrays.")
         return None
     n = A.shape[0]  # n is number of rows and columns in A
-    
+
+    if (method is None):
+        if (np.issubdtype(A.dtype,np.integer)):
+            method = 'bareiss'
+        else:
+            method = 'elimination'
+
+    if (method == 'elimination'):
+        LU, perm = LUFactorization(A,packed=True)
+
+        # Each cycle of length c in the permutation needs c-1 row swaps
+        D = 1.
+        visited = np.zeros(n,dtype='bool')
+        for i in range(n):
+            j = i
+            while (not visited[j]):
+                visited[j] = True
+                j = perm[j]
+                if (j != i):
+                    D = -D
+        return D*np.prod(np.diag(LU))
+
+    if (method == 'bareiss'):
+        # The divisions are carried out with //, which is exact only when
+        # all of the entries are integers
+        integer_entries = (np.issubdtype(A.dtype,np.integer) or 
+                           np.issubdtype(A.dtype,np.bool_))
+        if (A.dtype == object):
+            integer_entries = all(isinstance(a,(int,np.integer)) 
+                                  for a in A.flat)
+        if (not integer_entries):
+            raise ValueError("The 'bareiss' method requires an array of "
+                             "integers.")
+        M = np.array(A,dtype='object')
+        D = 1
+        previous_pivot = 1
+        for k in range(n-1):
+            # Find a nonzero pivot in column k
+            if (M[k,k] == 0):
+                nonzero_rows = [i for i in range(k+1,n) if M[i,k] != 0]
+                if (len(nonzero_rows) == 0):
+                    return 0
+                RowSwap(M,k,nonzero_rows[0],inplace=True)
+                D = -D
+            # Each entry of the updated block is divisible by previous_pivot
+            M[k+1:,k+1:] = (M[k+1:,k+1:]*M[k,k] - 
+                            np.outer(M[k+1:,k],M[k,k+1:]))//previous_pivot
+            previous_pivot = M[k,k]
+        return D*M[n-1,n-1]
+
+    if (method != 'cofactor'):
+        print("Method must be 'elimination', 'bareiss', or 'cofactor'.")
+        return None
+
     size = A.shape[0]
+    if size == 1:
+        return A[0,0]
     if size == 2:
         return A[0,0]*A[1,1]-A[0,1]*A[1,0]
     
@@ -92,10 +289,189 @@ def DeterminantIteration(A):
                         if(j != n):
                             minor[k].append(A[i,j])
             Minor_array = np.array(minor)
-            cofactor = (-1)**(m+n)*DeterminantIteration(Minor_array)
+            cofactor = (-1)**(m+n)*DeterminantIteration(Minor_array,'cofactor')
             D += cofactor*A[m,n]
         return D
 
+class Diagonalization:
+    '''
+    Diagonalization(A, max_condition = 1e8)
+
+    Diagonalization computes and stores the factorization A = SDS^{-1} of an
+    nxn matrix A, where the columns of S are eigenvectors of A and D is the 
+    diagonal matrix of the corresponding eigenvalues.  S^{-1} is found from 
+    the LU factorization of S using Solver.
+
+    Once the factorization is stored, any function f of A is found by 
+    applying f to the eigenvalues, f(A) = Sf(D)S^{-1}.  Powers A^k, the
+    exponential exp(tA), and polynomials in A can be applied to many 
+    vectors, using only matrix-vector products with S and S^{-1}, without 
+    forming f(A) or repeatedly multiplying by A.
+
+    If A is not diagonalizable (defective), or the eigenvectors are so
+    close to dependent that the condition number of S is larger than 
+    max_condition, the factorization cannot be trusted.  In that case 
+    defective is True, and power, exp, and polynomial are computed 
+    directly from A instead.
+
+    Example
+    -------
+    diagonalization = Diagonalization(A)
+    X_100 = diagonalization.power(100,X)   # A^100 X
+
+    Parameters
+    ----------
+    A : NumPy array object of dimension nxn
+    max_condition : optional float
+
+    Attributes
+    ----------
+    A : NumPy array object of dimension nxn
+    S : NumPy array object of dimension nxn
+    D : NumPy array object of dimension nxn
+    S_inverse : NumPy array object of dimension nxn
+    evalues : NumPy array object of dimension n
+    condition : float, the condition number of S in the 1-norm
+    defective : bool
+    '''
+
+    def __init__(self, A, max_condition = 1e8):
+        # Check shape of A
+        if (A.shape[0] != A.shape[1]):
+            raise ValueError("Diagonalization accepts only square arrays.")
+        self.n = A.shape[0]
+        self.A = np.array(A)
+
+        self.evalues, self.S = sla.eig(A)
+        self.D = np.diag(self.evalues)
+
+        S_solver = Solver(self.S)
+        if (S_solver.singular):
+            self.S_inverse = None
+            self.condition = np.inf
+        else:
+            self.S_inverse = S_solver.solve(np.eye(self.n))
+            self.condition = _ConditionFromInverse(self.S,self.S_inverse)
+        self.defective = bool(self.condition > max_condition)
+
+    def _evaluate(self, values, X, real):
+        # Compute S f(D) S^{-1} X, or S f(D) S^{-1} if X is None, where
+        # values are the entries f(evalues) on the diagonal of f(D)
+        if (X is None):
+            result = (self.S*values)@self.S_inverse
+        else:
+            X = np.asarray(X)
+            Y = self.S_inverse@X.reshape((self.n,-1))
+            result = (self.S@(values[:,np.newaxis]*Y)).reshape(X.shape)
+        if (real):
+            result = np.real(result)
+        return result
+
+    def _real_input(self, X):
+        return not (np.iscomplexobj(self.A) or np.iscomplexobj(X))
+
+    def power(self, k, X = None):
+        '''
+        power(k, X = None)
+
+        Computes A^k, or A^kX if X is given.  X may be a single vector of 
+        shape (n,) or nx1, or an nxm array whose columns are m vectors.
+
+        Parameters
+        ----------
+        k : int
+        X : optional NumPy array object of dimension (n,), nx1, or nxm
+
+        Returns
+        -------
+        result : NumPy array object of dimension nxn, or the dimension of X
+        '''
+        if (self.defective):
+            A_k = MatrixPower(self.A,k)
+            return A_k if X is None else A_k@X
+        return self._evaluate(self.evalues**k,X,self._real_input(X))
+
+    def exp(self, t = 1., X = None):
+        '''
+        exp(t = 1., X = None)
+
+        Computes the matrix exponential exp(tA), or exp(tA)X if X is given.
+        X may be a single vector of shape (n,) or nx1, or an nxm array whose
+        columns are m vectors.
+
+        Parameters
+        ----------
+        t : optional float
+        X : optional NumPy array object of dimension (n,), nx1, or nxm
+
+        Returns
+        -------
+        result : NumPy array object of dimension nxn, or the dimension of X
+        '''
+        real = self._real_input(X) and not np.iscomplexobj(t)
+        if (self.defective):
+            E = sla.expm(t*self.A)
+            return E if X is None else E@X
+        return self._evaluate(np.exp(t*self.evalues),X,real)
+
+    def polynomial(self, coefficients, X = None):
+        '''
+        polynomial(coefficients, X = None)
+
+        Computes p(A) = c_0I + c_1A + c_2A^2 + ... + c_dA^d, or p(A)X if X
+        is given, where coefficients is the list [c_0, c_1, ..., c_d].
+
+        Parameters
+        ----------
+        coefficients : list or NumPy array object of dimension d+1
+        X : optional NumPy array object of dimension (n,), nx1, or nxm
+
+        Returns
+        -------
+        result : NumPy array object of dimension nxn, or the dimension of X
+        '''
+        coefficients = np.asarray(coefficients)
+        real = self._real_input(X) and not np.iscomplexobj(coefficients)
+        if (self.defective):
+            # Horner's method, p(A)X = c_0X + A(c_1X + A(c_2X + ...))
+            if (X is None):
+                X = np.eye(self.n)
+            result = coefficients[-1]*X
+            for c in coefficients[-2::-1]:
+                result = c*X + self.A@result
+            return result
+        values = np.polynomial.polynomial.polyval(self.evalues,coefficients)
+        return self._evaluate(values,X,real)
+
+    def apply(self, f, X = None):
+        '''
+        apply(f, X = None)
+
+        Computes f(A) = Sf(D)S^{-1}, or f(A)X if X is given, where f is a
+        function that accepts a NumPy array of eigenvalues and returns the
+        array of values of f.  The result is real if A and X are real and 
+        the imaginary part of the result is negligible.  A ValueError is 
+        raised if A is defective.
+
+        Parameters
+        ----------
+        f : function
+        X : optional NumPy array object of dimension (n,), nx1, or nxm
+
+        Returns
+        -------
+        result : NumPy array object of dimension nxn, or the dimension of X
+        '''
+        if (self.defective):
+            raise ValueError("A is defective or too close to defective "
+                             "to apply f through its diagonalization.")
+        result = self._evaluate(np.asarray(f(self.evalues)),X,False)
+        if (self._real_input(X) and np.iscomplexobj(result)):
+            scale = max(np.abs(result).max(),1.)
+            if (np.abs(result.imag).max() <= 1e-12*scale):
+                result = np.real(result)
+        return result
+
 def DotProduct(U,V):
     ''' 
     DotProduct(U,V)
@@ -121,24 +497,75 @@ def DotProduct(U,V):
         print("Dot product only accepts column vectors of equal length.")
         return
 
-    n = U.shape[0]
-    product = 0.0
-    
-    for i in range(n):
-        product += U[i,0]*V[i,0]
+    product = float(U[:,0]@V[:,0])
 
     return product
 
-def DrawGraph(A, pos = None):
+def DotProducts(U,V):
+    ''' 
+    DotProducts(U,V)
+    
+    DotProducts computes the Euclidean products of many pairs of vectors in
+    a single operation.  U and V may each be a single vector of shape (n,) 
+    or (n,1), or a kxn array whose rows are k vectors.  If both contain k 
+    vectors, the product of each row of U with the same row of V is found.
+    If one is a single vector, its product with each vector in the other 
+    is found.
+    
+    Parameters
+    ----------
+    U : NumPy array object of dimension (n,), nx1, or kxn
+    V : NumPy array object of dimension (n,), nx1, or kxn
+    
+    Returns
+    -------
+    products: float, or NumPy array object of dimension k
+    '''
+    U, U_single = _VectorStack(U)
+    V, V_single = _VectorStack(V)
+
+    if (U.shape[1] != V.shape[1]):
+        print("DotProducts only accepts vectors of equal length.")
+        return
+
+    if (U_single):
+        products = V@U[0]
+    elif (V_single):
+        products = U@V[0]
+    elif (U.shape[0] == V.shape[0]):
+        products = np.einsum('ij,ij->i',U,V)
+    else:
+        print("DotProducts accepts stacks of vectors with equal numbers of vectors.")
+        return
+
+    if (U_single and V_single):
+        return float(products[0])
+    return products
+
+def _VectorStack(U):
+    # Arrange U as a kxn array of row vectors.  Arrays of shape (n,) and 
+    # (n,1) represent a single vector.
+    U = np.asarray(U,dtype='float64')
+    if (U.ndim == 1):
+        return U.reshape((1,-1)), True
+    if (U.shape[1] == 1):
+        return U.reshape((1,-1)), True
+    return U, (U.shape[0] == 1)
+
+def DrawGraph(A, pos = None, weighted = False):
     '''
-    DrawGraph(A, pos = None)
+    DrawGraph(A, pos = None, weighted = False)
     
-    Draws a directed graph based on adjacency matrix A.
+    Draws a directed graph based on adjacency matrix A.  A may be a NumPy
+    array, a SciPy sparse matrix, or a list of edges (see GraphEdges).  
+    Any nonzero entry of A gives an edge.  If weighted is True, each edge 
+    is labeled with its weight.
 
     Parameters
     ----------
-    A : NumPy array object.
+    A : NumPy array object, SciPy sparse matrix, or list of edges
     pos: Optional dictionary to specify node coordinates
+    weighted: Optional bool
     
     Returns
     -------
@@ -148,128 +575,199 @@ def DrawGraph(A, pos = None):
     plt.figure(figsize=(6,6))
     G = nx.DiGraph()
     
-    N = A.shape[0]
-    edge_list = []
-    
-    for i in range(N):
-        for j in range(N):
-            if(A[i,j] == 1):
-                edge_list.append((i,j))
-    
-    G.add_edges_from(edge_list)
-    if (pos == None):
+    rows, columns, weights = GraphEdges(A)
+    G.add_weighted_edges_from(zip(rows.tolist(),columns.tolist(),
+                                  weights.tolist()))
+    if (pos is None):
         pos = nx.spring_layout(G)
     
     options = {"node_size" : 500, "with_labels": True,"font_size":20}
     nx.draw(G, pos,connectionstyle='arc3, rad = 0.1',arrowsize=30,**options)
+    if (weighted):
+        labels = nx.get_edge_attributes(G,'weight')
+        nx.draw_networkx_edge_labels(G,pos,edge_labels=labels,
+                                     connectionstyle='arc3, rad = 0.1')
     return pos
 
-def FullRowReduction(A, tol = 1e-14):
+def ForwardSubstitution(L,Y,unit_diagonal = False,transpose = False,
+                        out = None):
+    '''
+    ForwardSubstitution(L,Y,unit_diagonal = False,transpose = False,
+                        out = None)
+    
+    ForwardSubstitution performs forward substitution to find the solution
+    to a square lower triangular system LX = Y.  There is no error checking
+    to ensure that L is of full rank.  Only entries on and below the 
+    diagonal of L are used.
+
+    Y may contain k columns, in which case the k systems are solved 
+    together.  The rows are processed in blocks, and the effect of each 
+    block on the rows below it is removed with a single matrix product.
+
+    If unit_diagonal is True, the diagonal entries of L are taken to be 1,
+    as they are for the L in an LU factorization.  If transpose is True, 
+    the system L^TX = Y is solved instead.  If out is given, the solution 
+    is stored in that array (which may be Y itself) rather than in a new 
+    array.
+
+    Parameters
+    ----------
+    L : NumPy array object of dimension mxm
+    Y : NumPy array object of dimension mx1, (m,), or mxk
+    unit_diagonal : optional bool
+    transpose : optional bool
+    out : optional NumPy array object of dimension mx1 or mxk
+
+    Returns
+    -------
+    X : NumPy array object of dimension mx1 (mxk if Y is mxk)
+    '''
+    if (transpose):
+        return _TriangularSolve(L.transpose(),Y,False,unit_diagonal,out)
+    return _TriangularSolve(L,Y,True,unit_diagonal,out)
+
+def FullRowReduction(A, tol = 1e-14, pivoting = False, details = False):
     ''' 
-    FullRowReduction(A, tol = 1e-14)
+    FullRowReduction(A, tol = 1e-14, pivoting = False, details = False)
     
-    Produces RREF for matrix of any shape.  No pivot strategy implemented.
-    Entries with abs value < tol are set to zero to account for roundoff
-    errors.
+    Produces RREF for matrix of any shape.  Entries with abs value < tol are
+    set to zero to account for roundoff errors.
+
+    By default no pivot strategy is implemented, and the first nonzero
+    entry in each column is used as the pivot.  If pivoting is True, the 
+    entry of largest magnitude is used instead (partial pivoting), which
+    reduces the effect of roundoff errors.
+
+    All entries above and below each pivot are eliminated together in a 
+    single update, and only rows that were changed are checked for small
+    entries.
+
+    If details is True, an RREFResult is returned instead of B.  This 
+    contains B together with the pivot positions, rank, free variables, and
+    bases for the null space and column space of A, all recorded during 
+    the elimination.
     
     Parameters
     ----------
     A : NumPy array object of dimension mxn
     tol: optional float
+    pivoting: optional bool
+    details: optional bool
 
     Returns
     -------
-    B: NumPy array object of dimension mxn
+    B: NumPy array object of dimension mxn, or RREFResult
     '''
     
     m = A.shape[0]  # m is number of rows in A
     n = A.shape[1]  # n is number of columns in A
 
     B = np.copy(A).astype('float64')
+    B[np.abs(B) < tol] = 0
 
-    # Set initial pivot search position
+    # Set initial pivot position
     pivot_row = 0
-    pivot_col = 0
+    pivots = []
     
-    # Continue steps of elimination while possible pivot positions are 
-    # within bounds of the array.
+    # Step through the columns while possible pivot positions are within
+    # bounds of the array.  Columns with no nonzero entries at or below
+    # pivot_row do not contain a pivot.
     
-    while(pivot_row < m and pivot_col < n):
+    for pivot_col in range(n):
+        if (pivot_row == m):
+            break
+
+        column = B[pivot_row:,pivot_col]
+        if (pivoting):
+            search = np.argmax(np.abs(column))
+            if (column[search] == 0):
+                continue
+        else:
+            nonzero = np.flatnonzero(column)
+            if (len(nonzero) == 0):
+                continue
+            search = nonzero[0]
 
-        # Set pivot value to current pivot position
-        pivot = B[pivot_row,pivot_col]
-        
-        # If pivot is zero, search down current column, and then subsequent
-        # columns (at or beyond pivot_row) for the next nonzero entry in the 
-        # array is found, or the last entry is reached.
-
-        row_search = pivot_row
-        col_search = pivot_col
-        search_end = False
-
-        while(pivot == 0 and not search_end):
-            if(row_search < m-1):
-                row_search += 1
-                pivot = B[row_search,col_search]
-            else:
-                if(col_search < n-1):
-                    row_search = pivot_row
-                    col_search += 1
-                    pivot = B[row_search,col_search]
-                else:  
-                    # col_search = n-1 and row_search = m-1
-                    search_end = True
-                        
         # Swap row if needed to bring pivot to position for rref
-        if (pivot != 0 and pivot_row != row_search):
-            B = RowSwap(B,pivot_row,row_search)
-            pivot_row, row_search = row_search, pivot_row
+        if (search != 0):
+            RowSwap(B,pivot_row,pivot_row+search,inplace=True)
             
-        # Set pivot position to search position
-        pivot_row = row_search
-        pivot_col = col_search
-            
-        # If pivot is nonzero, carry on with elimination in pivot column 
-        if (pivot != 0):
-            
-            # Set pivot entry to one
-            B = RowScale(B,pivot_row,1./B[pivot_row,pivot_col])
-
-            # Create zeros above pivot
-            for i in range(pivot_row):    
-                B = RowAdd(B,pivot_row,i,-B[i][pivot_col])
-                # Force known zeros
-                B[i,pivot_col] = 0
-
-            # Create zeros below pivot
-            for i in range(pivot_row+1,m):    
-                B = RowAdd(B,pivot_row,i,-B[i][pivot_col])
-                # Force known zeros
-                B[i,pivot_col] = 0
-
-            # Force small numbers to zero to account for roundoff error
-            for i in range(m):
-                for j in range(n):
-                    if abs(B[i,j])< tol :
-                        B[i,j] = 0
-
-        # Advance to next possible pivot position
+        # Set pivot entry to one.  Entries left of the pivot are already
+        # zero, and are not scaled so that they do not become -0.
+        B[pivot_row,pivot_col:] *= 1./B[pivot_row,pivot_col]
+
+        # Create zeros above and below pivot with a single update of the 
+        # rows that have a nonzero entry in the pivot column
+        factors = B[:,pivot_col].copy()
+        factors[pivot_row] = 0
+        rows = np.flatnonzero(factors)
+        B[rows,pivot_col:] -= np.outer(factors[rows],B[pivot_row,pivot_col:])
+        # Force known zeros
+        B[rows,pivot_col] = 0
+
+        # Force small numbers to zero to account for roundoff error.  Only
+        # entries in the changed rows, at or right of pivot_col, are checked.
+        rows = np.append(rows,pivot_row)
+        changed = B[rows,pivot_col:]
+        changed[np.abs(changed) < tol] = 0
+        B[rows,pivot_col:] = changed
+
+        # Record pivot and advance to next possible pivot position
+        pivots.append(pivot_col)
         pivot_row += 1
-        pivot_col += 1
+
+    if (details):
+        return RREFResult(A,B,pivots)
         
     return B
 
+def GraphEdges(A):
+    '''
+    GraphEdges(A)
+    
+    Finds the edges of the directed graph with adjacency matrix A.  There 
+    is an edge from node i to node j for each nonzero entry A[i,j], and 
+    the entry is used as the weight of the edge.  A may be a NumPy array, 
+    a SciPy sparse matrix, or a list of edges given as pairs (i,j) or as 
+    triples (i,j,weight).
+
+    Parameters
+    ----------
+    A : NumPy array object, SciPy sparse matrix, or list of tuples
+
+    Returns
+    -------
+    rows : NumPy array object of dimension E containing ints
+    columns : NumPy array object of dimension E containing ints
+    weights : NumPy array object of dimension E
+    '''
+    if (hasattr(A,'tocoo')):
+        A = A.tocoo()
+        nonzero = (A.data != 0)
+        return A.row[nonzero], A.col[nonzero], A.data[nonzero]
+
+    if (isinstance(A,np.ndarray)):
+        rows, columns = np.nonzero(A)
+        return rows, columns, A[rows,columns]
+
+    edges = list(A)
+    rows = np.array([edge[0] for edge in edges],dtype='int')
+    columns = np.array([edge[1] for edge in edges],dtype='int')
+    weights = np.array([edge[2] if len(edge) > 2 else 1 for edge in edges])
+    return rows, columns, weights
+
 def HighlightSubgraph(A,pos,subgraph):
     '''
     HighlightSubgraph(A,pos,subgraph)
     
     Draws directed graph based on adjacency matrix A, with node positions pos,
     then colors a subgraph containing nodes in nodelist and edges connecting
-    connecting nodes in nodelist    
+    connecting nodes in nodelist.  A may be a NumPy array, a SciPy sparse 
+    matrix, or a list of edges (see GraphEdges).
 
     Parameters
     ----------
-    A : NumPy array object
+    A : NumPy array object, SciPy sparse matrix, or list of edges
     
     pos : dictionary of node positions
     
@@ -283,19 +781,12 @@ def HighlightSubgraph(A,pos,subgraph):
     plt.figure(figsize=(6,6))
     G = nx.DiGraph()
     
-    N = A.shape[0]
-    edge_list = []
-    subgraph_edges = []
-    
-    for i in range(N):
-        for j in range(N):
-            if(A[i,j] == 1):
-                edge_list.append((i,j))
- 
-    for edge in edge_list:           
-        if (edge[0] in subgraph and edge[1] in subgraph):
-                    subgraph_edges.append(edge)
-    
+    rows, columns, weights = GraphEdges(A)
+    edge_list = list(zip(rows.tolist(),columns.tolist()))
+
+    # An edge is in the subgraph if both of its nodes are in the subgraph
+    in_subgraph = np.isin(rows,list(subgraph)) & np.isin(columns,list(subgraph))
+    subgraph_edges = [edge_list[k] for k in np.flatnonzero(in_subgraph)]
 
     G.add_edges_from(edge_list)
     
@@ -315,8 +806,12 @@ def Inverse(A):
     Inverse(A)
     
     A is a NumPy array that represents a matrix of dimension n x n.
-    Inverse computes the inverse matrix by solving AX=I where I is the identity.
-    If A is not invertible, Inverse will not return correct results.
+    Inverse computes the inverse matrix by solving AX=I where I is the 
+    identity.  A is factored once with LUFactorization, and all n columns
+    of I are handled in the same triangular solves.  
+
+    If A is singular, or so close to singular that the computed inverse 
+    would be meaningless (see ConditionNumber), a ValueError is raised.
 
     Parameters
     ----------
@@ -333,25 +828,257 @@ def Inverse(A):
         return
     n = A.shape[0]  # n is number of rows and columns in A
 
-    I = np.eye(n)
-    
-    # The augmented matrix is A together with all the columns of I.  RowReduction is
-    # carried out simultaneously for all n systems.
-    A_augmented = np.hstack((A,I))
-    R = RowReduction(A_augmented)
-    
-    Inverse = np.zeros((n,n))
-    
-    # Now BackSubstitution is carried out for each column and the result is stored 
-    # in the corresponding column of Inverse.
-    A_reduced = R[:,0:n]
-    for i in range(0,n):
-        B_reduced = R[:,n+i:n+i+1]
-        Inverse[:,i:i+1] = BackSubstitution(A_reduced,B_reduced)
+    S = Solver(A)
+    if (S.singular):
+        raise ValueError("A is singular and does not have an inverse.")
+
+    Inverse = S.solve(np.eye(n))
+
+    # Estimate the condition number from the norms of A and its inverse
+    condition = _ConditionFromInverse(A,Inverse)
+    if (condition*np.finfo('float64').eps > 1):
+        raise ValueError("A is singular to working precision.  The condition number is approximately " 
+                         + format(condition,'.1e') + ".")
     
     return(Inverse)
 
 
+def InversePowerMethod(A, shift = 0., X = None, tolerance = 1e-8, 
+                       max_iterations = 1000, update_shift = False):
+    '''
+    InversePowerMethod(A, shift = 0., X = None, tolerance = 1e-8, 
+                       max_iterations = 1000, update_shift = False)
+
+    InversePowerMethod approximates the eigenvalue of the nxn matrix A that
+    is closest to shift, together with a unit eigenvector, by applying the
+    power method to the inverse of A - shift*I.  Rather than computing the
+    inverse, A - shift*I is factored once with Solver, and each iteration 
+    solves (A - shift*I)X_new = X using the stored factors.  With shift = 0
+    this finds the eigenvalue of smallest magnitude.
+
+    The eigenvalue is estimated with the Rayleigh quotient X^TAX, and the
+    iteration stops when the magnitude of AX - (X^TAX)X is less than 
+    tolerance, or after max_iterations iterations.  If update_shift is
+    True, the shift is replaced by the Rayleigh quotient at every step 
+    (Rayleigh quotient iteration).  This needs a new factorization at each
+    step, but usually converges in very few steps.
+
+    Parameters
+    ----------
+    A : NumPy array object of dimension nxn
+    shift : optional float
+    X : optional NumPy array object of dimension nx1, the starting vector
+    tolerance : optional float
+    max_iterations : optional int
+    update_shift : optional bool
+
+    Returns
+    -------
+    eigenvalue : float
+    X : NumPy array object of dimension nx1
+    info : dictionary with the number of 'iterations', the final 
+           'residual' magnitude, and whether the iteration 'converged'
+    '''
+    # Check shape of A
+    if (A.shape[0] != A.shape[1]):
+        print("InversePowerMethod accepts only square arrays.")
+        return None
+    n = A.shape[0]
+    A = np.array(A,dtype='float64')
+    X = _StartingVectors(n,1,X)
+    
+    def Factor(shift):
+        S = Solver(A - shift*np.eye(n))
+        if (S.singular):
+            # The shift is an eigenvalue.  Move it slightly so that the
+            # system can be solved, which gives a very large growth in the
+            # direction of the eigenvector.
+            perturbation = np.finfo('float64').eps*max(1.,np.abs(A).max())
+            S = Solver(A - (shift + perturbation)*np.eye(n))
+        return S
+
+    S = Factor(shift)
+    m = 0
+    eigenvalue = float(X[:,0]@(A@X[:,0]))
+    residual = Magnitude(A@X - eigenvalue*X)
+
+    while (m < max_iterations and residual >= tolerance):
+        X = S.solve(X)
+        X = X/Magnitude(X)
+        eigenvalue = float(X[:,0]@(A@X[:,0]))
+        residual = Magnitude(A@X - eigenvalue*X)
+        if (update_shift and residual >= tolerance):
+            S = Factor(eigenvalue)
+        m = m + 1
+
+    info = {'iterations':m, 'residual':residual, 
+            'converged':bool(residual < tolerance)}
+    return eigenvalue, X, info
+
+class LeastSquares:
+    '''
+    LeastSquares(A,B)
+
+    LeastSquares computes the least squares solutions to AX = B, where A is
+    mxn with linearly independent columns and each of the k columns of B is
+    a different right hand side.  Rather than solving the normal equations 
+    A^TAX = A^TB, A is factored as A = QR using Householder reflections and
+    the solutions are found from RX = Q^TB.  This avoids the loss of 
+    accuracy that comes from forming A^TA.
+
+    Only R, the first n rows of Q^TB, and the squares of the residual norms
+    are kept.  New rows of A and B can then be included with add_rows, 
+    without repeating the work for the rows already included.
+
+    Example
+    -------
+    LS = LeastSquares(A,B)
+    X = LS.solution
+    LS.add_rows(A_new,B_new)
+    X_updated = LS.solution
+
+    Parameters
+    ----------
+    A : NumPy array object of dimension mxn
+    B : NumPy array object of dimension mxk (or (m,))
+
+    Attributes
+    ----------
+    solution : NumPy array object of dimension nxk, least squares solutions
+    residual_norms : NumPy array object of dimension k, the magnitudes of
+                     the residuals AX - B for each column of B
+    R : NumPy array object of dimension nxn
+    '''
+
+    def __init__(self, A, B):
+        if (A.shape[0] < A.shape[1]):
+            raise ValueError("A must have more rows than columns for least squares.")
+        if (A.shape[0] != B.shape[0]):
+            raise ValueError("A and B must have the same number of rows.")
+        self.n = A.shape[1]
+        B = np.array(B,dtype='float64').reshape((A.shape[0],-1))
+        
+        H, tau, self.R = QRFactorization(A,method='householder',implicit=True)
+        QTB = ApplyHouseholder(H,tau,B,transpose=True)
+        self.Z = QTB[:self.n]
+        self.residual_squares = np.sum(QTB[self.n:]**2,axis=0)
+        self._solve()
+
+    def add_rows(self, A_new, B_new):
+        '''
+        add_rows(A_new,B_new)
+
+        Includes new rows in A and B and updates the solution.  Since 
+        Q^T[A|B] has rows [R|Z] followed by rows that contain only the 
+        residuals, the new solution is found by factoring the rows of
+        [R|Z] together with [A_new|B_new].
+
+        Parameters
+        ----------
+        A_new : NumPy array object of dimension pxn (or (n,) for one row)
+        B_new : NumPy array object of dimension pxk (or (p,))
+        '''
+        A_new = np.array(A_new,dtype='float64').reshape((-1,self.n))
+        B_new = np.array(B_new,dtype='float64').reshape((A_new.shape[0],-1))
+
+        M = np.vstack((np.hstack((self.R,self.Z)),np.hstack((A_new,B_new))))
+        H, tau, self.R = QRFactorization(M[:,:self.n],method='householder',
+                                         implicit=True)
+        QTZ = ApplyHouseholder(H,tau,M[:,self.n:],transpose=True)
+        self.Z = QTZ[:self.n]
+        self.residual_squares = self.residual_squares + np.sum(QTZ[self.n:]**2,axis=0)
+        self._solve()
+
+    def _solve(self):
+        # Solve RX = Z by back substitution for all columns of Z at once
+        if (np.any(np.diag(self.R) == 0)):
+            print("The columns of A are not linearly independent.")
+        self.solution = BackSubstitution(self.R,self.Z)
+        self.residual_norms = np.sqrt(self.residual_squares)
+
+
+def LUFactorization(A, packed = False, block_size = 64):
+    '''
+    LUFactorization(A, packed = False, block_size = 64)
+
+    LUFactorization computes the factorization PA = LU of an nxn matrix A
+    using elimination with partial pivoting.  P is a permutation matrix, L is
+    lower triangular with ones on the diagonal, and U is upper triangular.
+
+    The elimination is carried out on blocks of block_size columns.  Each
+    block is factored column by column, and the remaining rows and columns
+    are then updated all at once with a single matrix product, which is much
+    faster than carrying out the row operations one at a time.
+
+    If A is singular, U will have a zero entry on the diagonal and no error
+    is reported.
+
+    If packed is True, L and U are returned together in a single array LU,
+    with the entries of L (excluding the diagonal ones) below the diagonal
+    and U on and above the diagonal.  The row swaps are returned as an
+    array of indices perm, so that A[perm,:] = LU.
+
+    Parameters
+    ----------
+    A : NumPy array object of dimension nxn
+    packed: optional bool
+    block_size: optional int
+
+    Returns
+    -------
+    P : NumPy array object of dimension nxn
+    L : NumPy array object of dimension nxn
+    U : NumPy array object of dimension nxn
+
+    or, if packed is True,
+
+    LU : NumPy array object of dimension nxn
+    perm : NumPy array object of dimension n containing ints
+    '''
+
+    # Check shape of A
+    if (A.shape[0] != A.shape[1]):
+        print("LUFactorization accepts only square arrays.")
+        return None
+    n = A.shape[0]  # n is number of rows and columns in A
+
+    LU = np.copy(A).astype('complex128' if np.iscomplexobj(A) else 'float64')
+    perm = np.arange(n)
+
+    for k in range(0,n,block_size):
+        k_end = min(k+block_size,n)
+
+        # Factor the block of columns k to k_end-1.  Row swaps are applied
+        # to the full rows of LU, but elimination is restricted to the block.
+        for j in range(k,k_end):
+            # Choose the entry of largest magnitude in column j as the pivot
+            pivot_row = j + np.argmax(np.abs(LU[j:,j]))
+            if (pivot_row != j):
+                RowSwap(LU,j,pivot_row,inplace=True)
+                perm[[j,pivot_row]] = perm[[pivot_row,j]]
+
+            if (LU[j,j] != 0):
+                LU[j+1:,j] /= LU[j,j]
+                LU[j+1:,j+1:k_end] -= np.outer(LU[j+1:,j],LU[j,j+1:k_end])
+
+        if (k_end < n):
+            # Rows k to k_end-1 of U to the right of the block are found by
+            # forward substitution with the unit lower triangular block.
+            for i in range(k+1,k_end):
+                LU[i,k_end:] -= LU[i,k:i]@LU[k:i,k_end:]
+
+            # Update all remaining rows and columns with a matrix product
+            LU[k_end:,k_end:] -= LU[k_end:,k:k_end]@LU[k:k_end,k_end:]
+
+    if (packed):
+        return LU, perm
+
+    P = np.eye(n)[perm,:]
+    L = np.tril(LU,-1) + np.eye(n)
+    U = np.triu(LU)
+
+    return P, L, U
+
 
 def Magnitude(U):
     ''' 
@@ -375,25 +1102,309 @@ def Magnitude(U):
     magnitude = math.sqrt(DotProduct(U,U))
     return magnitude    
 
-def QRFactorization(A):
+def Magnitudes(U):
     ''' 
-    QRFactorization(A)
+    Magnitudes(U)
+    
+    Magnitudes computes the magnitudes of many vectors in a single 
+    operation.  U may be a single vector of shape (n,) or (n,1), or a kxn
+    array whose rows are k vectors.
+    
+    Parameters
+    ----------
+    U : NumPy array object of dimension (n,), nx1, or kxn
+    
+    Returns
+    -------
+    magnitudes: float, or NumPy array object of dimension k
+    '''
+    U, single = _VectorStack(U)
+    magnitudes = np.sqrt(np.einsum('ij,ij->i',U,U))
+
+    if (single):
+        return float(magnitudes[0])
+    return magnitudes
+
+def MatrixPower(A, k, method = 'squaring'):
+    '''
+    MatrixPower(A, k, method = 'squaring')
+
+    MatrixPower computes A^k for an nxn matrix A and an integer k >= 0, so 
+    that the state X_k = A^kX_0 of the dynamical system X_t = AX_{t-1} can
+    be found without computing all of the states in between.
+
+    The method can be one of the following.
+    'squaring' : A^k is built from the powers A, A^2, A^4, A^8, ... which
+                 are found by repeated squaring.  This requires only about
+                 2log_2(k) matrix products.
+    'eigen' : A^k = SD^kS^{-1}, where the columns of S are eigenvectors of A
+              and D is the diagonal matrix of eigenvalues.  This requires the
+              same amount of work for any k.  If A is defective, 
+              repeated squaring is used instead (see Diagonalization).
+
+    Parameters
+    ----------
+    A : NumPy array object of dimension nxn
+    k : int
+    method : optional string
+
+    Returns
+    -------
+    A_k : NumPy array object of dimension nxn
+    '''
+    # Check shape of A
+    if (A.shape[0] != A.shape[1]):
+        print("MatrixPower accepts only square arrays.")
+        return None
+    if (k < 0):
+        raise ValueError("k must be a nonnegative integer.")
+    n = A.shape[0]
+
+    if (method == 'eigen'):
+        return Diagonalization(A).power(k)
+    elif (method != 'squaring'):
+        raise ValueError("method must be 'squaring' or 'eigen'.")
+
+    A_k = np.eye(n,dtype=np.result_type(A,'int64'))
+    square = np.array(A)
+    while (k > 0):
+        if (k % 2 == 1):
+            A_k = A_k@square
+        k = k//2
+        if (k > 0):
+            square = square@square
+    return A_k
+
+def PageRank(A, damping = 0.85, n = None, method = 'power', 
+             tolerance = 1e-10, max_iterations = 1000):
+    '''
+    PageRank(A, damping = 0.85, n = None, method = 'power', 
+             tolerance = 1e-10, max_iterations = 1000)
+
+    PageRank finds the steady state of the web navigation model for the
+    directed graph with adjacency matrix A.  There is a link from page i 
+    to page j for each nonzero entry A[i,j] (see GraphEdges), and links are
+    followed in proportion to their weights.  At each step the browser 
+    follows a link with probability damping, and otherwise moves to any of
+    the n pages with equal probability.  A browser on a page with no links
+    (a dangling node) moves to any page with equal probability.
+
+    The matrix of the model is never formed.  Only the sparse matrix of
+    link probabilities is stored, and the damping and dangling nodes are 
+    accounted for with a few vector operations at each step.  The iteration
+    stops when the sum of the absolute values of the changes in the ranks
+    is less than tolerance, or after max_iterations iterations.
+
+    The method can be one of the following.
+    'power' : the power method X_t = MX_{t-1}.
+    'extrapolation' : the power method, with power extrapolation tried
+                      every 10 steps.  This removes the part of the error
+                      that decays at the rate damping, which is usually
+                      the slowest decaying part for web graphs.  If the
+                      step after an extrapolation does not improve on a
+                      power step, the extrapolation is discarded and the
+                      power method continues without it.
+    'gauss-seidel' : Gauss-Seidel iteration for the equivalent linear 
+                     system.  Each step costs more than a power step, but 
+                     fewer steps are usually needed.
+
+    Parameters
+    ----------
+    A : NumPy array object, SciPy sparse matrix, or list of edges
+    damping : optional float
+    n : optional int, the number of pages.  By default this is the size of
+        A, or one more than the largest page in the list of edges.
+    method : optional string
+    tolerance : optional float
+    max_iterations : optional int
+
+    Returns
+    -------
+    ranks : NumPy array object of dimension n, with entries that sum to one
+    info : dictionary with the number of 'iterations', the final 
+           'residual', and whether the iteration 'converged'
+    '''
+    if (method not in ['power','extrapolation','gauss-seidel']):
+        raise ValueError("method must be 'power', 'extrapolation', "
+                         "or 'gauss-seidel'.")
+    rows, columns, weights = GraphEdges(A)
+    if (n is None):
+        if (hasattr(A,'shape')):
+            n = A.shape[0]
+        else:
+            n = int(max(rows.max(),columns.max())+1) if len(rows) else 0
+    weights = np.asarray(weights,dtype='float64')
+
+    # M[j,i] is the probability of following a link from page i to page j
+    out_weights = np.bincount(rows,weights=weights,minlength=n)
+    dangling = (out_weights == 0)
+    M = sparse.csr_matrix((weights/out_weights[rows],(columns,rows)),
+                          shape=(n,n))
+    M.sum_duplicates()
+
+    X = np.full(n,1/n)
+    m = 0
+    residual = np.inf
+
+    if (method == 'gauss-seidel'):
+        # The ranks are proportional to the solution of (I - damping*M)Y = E
+        # where E has all entries equal to 1/n.  Split I - damping*M into
+        # its lower triangular part L and its strictly upper part U.
+        E = X.copy()
+        # SuperLU with the natural ordering leaves the triangular L as it is
+        # and carries out each triangular solve in compiled code.
+        L = sparse.identity(n) - damping*sparse.tril(M,0)
+        L = spla.splu(sparse.csc_matrix(L),permc_spec='NATURAL',
+                      diag_pivot_thresh=0,options={'SymmetricMode':True})
+        U = damping*sparse.triu(M,1,format='csr')
+        Y = X.copy()
+        while (m < max_iterations and residual >= tolerance):
+            Y = L.solve(E + U@Y)
+            X_new = Y/Y.sum()
+            residual = np.abs(X_new - X).sum()
+            X = X_new
+            m = m + 1
+    else:
+        extrapolate = (method == 'extrapolation')
+        saved = None
+        rate = 1.
+        while (m < max_iterations and residual >= tolerance):
+            X_new = damping*(M@X) + (damping*X[dangling].sum() + 1 - damping)/n
+            previous_residual = residual
+            residual = np.abs(X_new - X).sum()
+            m = m + 1
+
+            if (saved is not None):
+                # Keep the extrapolation only if the step after it changed
+                # the ranks less than a power step would have been expected
+                # to.  Otherwise return to the saved ranks and do not 
+                # extrapolate again.
+                X_saved, residual_saved = saved
+                saved = None
+                if (residual >= rate*residual_saved):
+                    extrapolate = False
+                    X = X_saved
+                    residual = residual_saved
+                    continue
+            elif (residual < previous_residual):
+                rate = residual/previous_residual
+
+            if (extrapolate and m % 10 == 0 and rate < 1 and 
+                    residual >= tolerance):
+                # Remove the error component with eigenvalue damping
+                saved = (X_new, residual)
+                X_new = np.maximum((X_new - damping*X)/(1 - damping),0)
+                X_new = X_new/X_new.sum()
+            X = X_new
+
+    info = {'iterations':m, 'residual':residual, 
+            'converged':bool(residual < tolerance)}
+    return X, info
+
+def PowerMethod(A, X = None, tolerance = 1e-8, max_iterations = 1000):
+    '''
+    PowerMethod(A, X = None, tolerance = 1e-8, max_iterations = 1000)
+
+    PowerMethod approximates the eigenvalue of largest magnitude of the nxn
+    matrix A, together with a unit eigenvector, by repeatedly multiplying
+    X by A and scaling the result to unit length.
+
+    The eigenvalue is estimated with the Rayleigh quotient X^TAX, which is 
+    usually a more accurate estimate than the magnitude of AX, and also 
+    gives the sign of the eigenvalue.  The iteration stops when the 
+    magnitude of AX - (X^TAX)X is less than tolerance, or after 
+    max_iterations iterations.
+
+    Parameters
+    ----------
+    A : NumPy array object of dimension nxn
+    X : optional NumPy array object of dimension nx1, the starting vector
+    tolerance : optional float
+    max_iterations : optional int
+
+    Returns
+    -------
+    eigenvalue : float
+    X : NumPy array object of dimension nx1
+    info : dictionary with the number of 'iterations', the final 
+           'residual' magnitude, and whether the iteration 'converged'
+    '''
+    # Check shape of A
+    if (A.shape[0] != A.shape[1]):
+        print("PowerMethod accepts only square arrays.")
+        return None
+    n = A.shape[0]
+    X = _StartingVectors(n,1,X)
+
+    m = 0
+    Y = A@X
+    eigenvalue = float(X[:,0]@Y[:,0])
+    residual = Magnitude(Y - eigenvalue*X)
+
+    while (m < max_iterations and residual >= tolerance):
+        X = Y/Magnitude(Y)
+        Y = A@X
+        eigenvalue = float(X[:,0]@Y[:,0])
+        residual = Magnitude(Y - eigenvalue*X)
+        m = m + 1
+
+    info = {'iterations':m, 'residual':residual, 
+            'converged':bool(residual < tolerance)}
+    return eigenvalue, X, info
+
+def _StartingVectors(n,k,X):
+    # Return X as an nxk float array, or k fixed random starting vectors
+    # if X is not given.
+    if (X is None):
+        X = np.random.default_rng(0).standard_normal((n,k))
+    X = np.array(X,dtype='float64').reshape((n,k))
+    return X/np.sqrt(np.sum(X*X,axis=0))
+
+def QRFactorization(A, method = 'classical', mode = 'economy', 
+                    implicit = False, block_size = 32):
+    ''' 
+    QRFactorization(A, method = 'classical', mode = 'economy', 
+                    implicit = False, block_size = 32)
     
     A is a Numpy array that represents a matrix of dimension m x n.
     QRFactorization returns matrices Q and R such that A=QR, Q is orthogonal
-    and R is upper triangular.  The factorization is carried out using classical
-    Gram-Schmidt and the results may suffer due to numerical instability.
-    QRFactorization may not return correct results if the columns of A are 
-    linearly dependent.
+    and R is upper triangular.  Three methods are available.
+
+    'classical' carries out the factorization using classical Gram-Schmidt, 
+    and R is computed as Q^TA.  The results may suffer due to numerical 
+    instability.  QRFactorization may not return correct results if the 
+    columns of A are linearly dependent.
+
+    'modified' uses modified Gram-Schmidt, in which the projection onto 
+    each new column of Q is removed from all of the remaining columns at 
+    once.  This is less affected by roundoff error, and R is produced 
+    directly.
+
+    'householder' reduces A to R with Householder reflections, applied to
+    blocks of block_size columns at a time.  This is the most accurate 
+    method.  With mode = 'full', Q is mxm and R is mxn.  With implicit = 
+    True, Q is not formed.  Instead the reflections are returned as an mxn
+    array H, holding the reflection vectors below the diagonal, together 
+    with an array tau.  Q can then be applied with ApplyHouseholder.
     
     Parameters
     ----------
     A : NumPy array object of dimension mxn
+    method : optional string, 'classical', 'modified', or 'householder'
+    mode : optional string, 'economy' or 'full'
+    implicit : optional bool
+    block_size : optional int
     
     Returns
     -------
-    Q : NumPy array object of dimension mxn
-    R : NumPy array object of dimension nxn
+    Q : NumPy array object of dimension mxn (mxm if mode is 'full')
+    R : NumPy array object of dimension nxn (mxn if mode is 'full')
+
+    or, if implicit is True,
+
+    H : NumPy array object of dimension mxn
+    tau : NumPy array object of dimension n
+    R : NumPy array object of dimension nxn (mxn if mode is 'full')
     '''
 
     # Check shape of A
@@ -403,108 +1414,252 @@ def QRFactorization(A):
 
     m = A.shape[0]
     n = A.shape[1]
-    
-    Q = np.zeros((m,n))
-    R = np.zeros((n,n))
-    
-    for i in range(n):
-        W = A[:,i:i+1]
-        for j in range(i):
-                W = W - DotProduct(A[:,i:i+1],Q[:,j:j+1])*Q[:,j:j+1]
-        Q[:,i:i+1] = W/Magnitude(W)
-        
-    R = Q.transpose()@A
-    
+
+    if (method != 'householder' and (mode != 'economy' or implicit)):
+        print("Full and implicit modes are only available with method = 'householder'.")
+        return
+
+    if (method == 'classical'):
+        Q = np.zeros((m,n))
+        R = np.zeros((n,n))
+
+        for i in range(n):
+            # Subtract the projections of column i onto columns 0 to i-1 of Q
+            W = A[:,i:i+1] - Q[:,:i]@(Q[:,:i].transpose()@A[:,i:i+1])
+            Q[:,i:i+1] = W/np.sqrt(np.sum(W*W))
+            
+        R = Q.transpose()@A
+
+        return (Q,R)
+
+    if (method == 'modified'):
+        Q = np.copy(A).astype('float64')
+        R = np.zeros((n,n))
+
+        for i in range(n):
+            R[i,i] = np.sqrt(Q[:,i]@Q[:,i])
+            Q[:,i] /= R[i,i]
+            # Remove the projection onto column i from remaining columns
+            R[i,i+1:] = Q[:,i]@Q[:,i+1:]
+            Q[:,i+1:] -= np.outer(Q[:,i],R[i,i+1:])
+
+        return (Q,R)
+
+    if (method != 'householder'):
+        print("Method must be 'classical', 'modified', or 'householder'.")
+        return
+
+    H = np.copy(A).astype('float64')
+    tau = np.zeros(n)
+
+    for k in range(0,n,block_size):
+        k_end = min(k+block_size,n)
+
+        # Reduce columns k to k_end-1.  Each reflection is I - tau*v*v^T,
+        # where v has first entry one and is stored below the diagonal.
+        for j in range(k,k_end):
+            x = H[j:,j]
+            norm_x = np.sqrt(x@x)
+            if (norm_x == 0):
+                continue
+            alpha = -norm_x if x[0] >= 0 else norm_x
+            v = x/(x[0]-alpha)
+            v[0] = 1.
+            tau[j] = (alpha-x[0])/alpha
+            H[j:,j+1:k_end] -= tau[j]*np.outer(v,v@H[j:,j+1:k_end])
+            H[j,j] = alpha
+            H[j+1:,j] = v[1:]
+
+        if (k_end < n):
+            # The product of the reflections in the block is I - VTV^T.  
+            # This is applied to the remaining columns with matrix products.
+            V, T = _HouseholderBlock(H,tau,k,k_end)
+            C = H[k:,k_end:]
+            C -= V@(T.transpose()@(V.transpose()@C))
+
+    if (mode == 'full'):
+        R = np.triu(H)
+    else:
+        R = np.triu(H[:n,:])
+
+    if (implicit):
+        return (H,tau,R)
+
+    if (mode == 'full'):
+        Q = np.eye(m)
+    else:
+        Q = np.eye(m,n)
+    Q = ApplyHouseholder(H,tau,Q,block_size=block_size)
+
     return (Q,R)
 
-def RowSwap(A,k,l):
+def _HouseholderBlock(H,tau,k,k_end):
+    # Form V and the upper triangular T such that the product of the 
+    # reflections k to k_end-1 stored in H is I - VTV^T.
+    b = k_end - k
+    V = np.tril(H[k:,k:k_end],-1)
+    V[np.arange(b),np.arange(b)] = 1.
+    T = np.zeros((b,b))
+    for i in range(b):
+        T[i,i] = tau[k+i]
+        T[:i,i] = -tau[k+i]*(T[:i,:i]@(V[:,:i].transpose()@V[:,i]))
+    return V, T
+
+class RREFResult:
+    '''
+    RREFResult(A,B,pivots)
+
+    RREFResult is returned by FullRowReduction(A,details=True).  It holds 
+    the RREF of A together with information that would otherwise need to 
+    be found by examining the RREF again.
+
+    Parameters
+    ----------
+    A : NumPy array object of dimension mxn
+    B : NumPy array object of dimension mxn, the RREF of A
+    pivots : list of ints, the columns of B that contain pivots
+
+    Attributes
+    ----------
+    reduced : NumPy array object of dimension mxn, the RREF of A
+    pivots : NumPy array object of dimension r, columns that contain pivots
+    rank : int, the number of pivots r
+    free_variables : NumPy array object of dimension n-r, columns without
+                     pivots
+    nullspace : NumPy array object of dimension nx(n-r), whose columns are
+                a basis for the null space of A
+    column_space : NumPy array object of dimension mxr, the pivot columns
+                   of A, which are a basis for the column space of A
+    '''
+
+    def __init__(self, A, B, pivots):
+        n = B.shape[1]
+        self.reduced = B
+        self.pivots = np.array(pivots,dtype='int')
+        self.rank = len(pivots)
+        self.free_variables = np.setdiff1d(np.arange(n),self.pivots)
+
+        # Each free variable is set to one in turn, with the others zero,
+        # and the pivot variables are then read from the rows of B.
+        r = self.rank
+        self.nullspace = np.zeros((n,n-r))
+        self.nullspace[self.free_variables,np.arange(n-r)] = 1
+        self.nullspace[self.pivots,:] = 0 - B[:r,self.free_variables]
+
+        self.column_space = np.array(A[:,self.pivots],dtype='float64')
+
+    def consistent(self):
+        '''
+        consistent()
+
+        If A is the augmented matrix of a linear system, the system is
+        consistent when there is no pivot in the last column.
+
+        Returns
+        -------
+        True or False
+        '''
+        return (self.reduced.shape[1]-1 not in self.pivots)
+
+
+def RowSwap(A,k,l,inplace = False):
     ''' 
-    RowSwap(A,k,l)
+    RowSwap(A,k,l,inplace = False)
     
     RowSwap performs a single row operation on the matrix A.
     The positions of rows k and l are swapped.
     No error checking on the range of k and l.
     
+    By default a new float64 array is returned and A is unchanged.  If 
+    inplace is True, the rows of A are swapped directly and A itself is
+    returned.  This avoids copying A and is used by the elimination routines
+    on their own working arrays.
+    
     Parameters
     ----------
     A : NumPy array object of dimension mxn
     k : int
     l : int
-    scale : float
+    inplace: optional bool
     
     Returns
     -------
     B: NumPy array object of dimension mxn
     '''
 
-    m = A.shape[0]  # m is number of rows in A
-    n = A.shape[1]  # n is number of columns in A
-    
-    B = np.copy(A).astype('float64')
+    if (inplace):
+        B = A
+    else:
+        B = np.copy(A).astype('float64')
 
-    for j in range(n):
-        temp = B[k][j]
-        B[k][j] = B[l][j]
-        B[l][j] = temp
+    B[[k,l]] = B[[l,k]]
         
     return B
 
-def RowScale(A,k,scale):
+def RowScale(A,k,scale,inplace = False):
     ''' 
-    RowScale(A,k,scale)
+    RowScale(A,k,scale,inplace = False)
     
     RowScale performs a single row operation on the matrix A.
     Row k is mulitiplied by scale, resulting in a new entries in row k.
     No error checking on the range of k.
     
+    By default a new float64 array is returned and A is unchanged.  If 
+    inplace is True, row k of A is scaled directly and A itself is returned.
+    A should then be a float array.
+    
     Parameters
     ----------
     A : NumPy array object of dimension mxn
     k : int
     scale : float
+    inplace: optional bool
     
     Returns
     -------
     B: NumPy array object of dimension mxn
     '''
     
-    m = A.shape[0]  # m is number of rows in A
-    n = A.shape[1]  # n is number of columns in A
-    
-    B = np.copy(A).astype('float64')
+    if (inplace):
+        B = A
+    else:
+        B = np.copy(A).astype('float64')
 
-    for j in range(n):
-        B[k][j] *= scale
+    B[k] *= scale
         
     return B
 
-def RowAdd(A,k,l,scale):
+def RowAdd(A,k,l,scale,inplace = False):
     ''' 
-    RowAdd(A,k,l,scale)
+    RowAdd(A,k,l,scale,inplace = False)
     
     RowAdd performs a single row operation on the matrix A.
     Row k is mulitiplied by scale and added to row l, replacing row l.
     No error checking on the range of k and l.
     
+    By default a new float64 array is returned and A is unchanged.  If 
+    inplace is True, row l of A is replaced directly and A itself is 
+    returned.  A should then be a float array.
+    
     Parameters
     ----------
     A : NumPy array object of dimension mxn
     k : int
     l : int
     scale : float
+    inplace: optional bool
     
     Returns
     -------
     B: NumPy array object of dimension mxn
     '''
 
-    m = A.shape[0]  # m is number of rows in A
-    n = A.shape[1]  # n is number of columns in A
-    
-    B = np.copy(A).astype('float64')
+    if (inplace):
+        B = A
+    else:
+        B = np.copy(A).astype('float64')
         
-    for j in range(n):
-        B[l][j] += B[k][j]*scale
+    B[l] += B[k]*scale
         
     return B
 
@@ -529,7 +1684,6 @@ def RowReduction(A):
     '''
     
     m = A.shape[0]  # A has m rows 
-    n = A.shape[1]  # It is assumed that A has m+1 columns
     
     B = np.copy(A).astype('float64')
 
@@ -548,13 +1702,14 @@ def RowReduction(A):
             
         # Swap row if needed
         if (pivot_row != k):
-            B = RowSwap(B,k,pivot_row)
+            RowSwap(B,k,pivot_row,inplace=True)
             
-        # If pivot is nonzero, carry on with elimination in column k
+        # If pivot is nonzero, carry on with elimination in column k.  The
+        # row operations act directly on B, and the RowAdd steps for all rows
+        # below the pivot are carried out together as a single update.
         if (pivot != 0):
-            B = RowScale(B,k,1./B[k][k])
-            for i in range(k+1,m):    
-                B = RowAdd(B,k,i,-B[i][k])
+            RowScale(B,k,1./B[k][k],inplace=True)
+            B[k+1:,:] -= np.outer(B[k+1:,k],B[k,:])
         else:
             print("Pivot could not be found in column",k,".")
             
@@ -565,8 +1720,9 @@ def ScaleMatrixRows(A):
     ''' 
     ScaleMatrixRows(A)
     
-    ScaleMatrix rows accepts an mxn array where each row has been scaled
-    to unit length.
+    ScaleMatrixRows returns the mxn array in which each row of A has been 
+    scaled to unit length.  Rows of zeros are left unchanged.  All rows are
+    scaled together in a single operation.
     
     Parameters
     ----------
@@ -577,27 +1733,92 @@ def ScaleMatrixRows(A):
     B: NumPy array object of dimension mxn
     '''    
     
-    m = A.shape[0]
-    n = A.shape[1]
-    
     B = np.copy(A).astype('float64')
 
-    for i in range(m):
-        row = A[i:i+1,:]
-        row_magnitude = Magnitude(row.transpose())
-        if (row_magnitude != 0):
-            for j in range(n):
-                B[i,j] = B[i,j]/row_magnitude
+    row_magnitudes = np.sqrt(np.einsum('ij,ij->i',B,B))
+    nonzero = (row_magnitudes != 0)
+    B[nonzero] /= row_magnitudes[nonzero,np.newaxis]
     
     return B
 
+class Solver:
+    '''
+    Solver(A)
+
+    Solver computes the LU factorization of an nxn matrix A once and stores
+    the factors, so that systems AX = B with the same A and many different
+    B can be solved without repeating the elimination.  Each call to solve
+    costs only a forward and a back substitution.
+
+    Example
+    -------
+    S = Solver(A)
+    X1 = S.solve(B1)
+    X2 = S.solve(B2)
+
+    Parameters
+    ----------
+    A : NumPy array object of dimension nxn
+    block_size: optional int, passed to LUFactorization
+
+    Attributes
+    ----------
+    LU : NumPy array object of dimension nxn, packed factors of A
+    perm : NumPy array object of dimension n, row permutation of A
+    singular : bool, True if a zero pivot was found
+    '''
+
+    def __init__(self, A, block_size = 64):
+        # Check shape of A
+        if (A.shape[0] != A.shape[1]):
+            raise ValueError("Solver accepts only square arrays.")
+        self.n = A.shape[0]
+        self.LU, self.perm = LUFactorization(A,packed=True,
+                                             block_size=block_size)
+        
+        self.singular = bool(np.any(np.diag(self.LU) == 0))
+
+    def solve(self, B):
+        '''
+        solve(B)
+
+        Computes the solution to AX = B.  B may be a single vector of shape
+        (n,1) or (n,), or an nxk array whose columns are k different right
+        hand sides.  All columns are handled in the same triangular sweeps.
+
+        Parameters
+        ----------
+        B : NumPy array object of dimension nx1, (n,), or nxk
+
+        Returns
+        -------
+        X: NumPy array object of dimension nx1 (nxk if B is nxk)
+        '''
+        n = self.n
+        LU = self.LU
+        if (B.shape[0] != n):
+            raise ValueError("B must have the same number of rows as A.")
+
+        # Apply the row swaps to B, solve LY = B by forward substitution,
+        # and then UX = Y by back substitution, all in the same array
+        complex_entries = np.iscomplexobj(LU) or np.iscomplexobj(B)
+        dtype = 'complex128' if complex_entries else 'float64'
+        X = np.array(B,dtype=dtype).reshape((n,-1))[self.perm,:]
+        ForwardSubstitution(LU,X,unit_diagonal=True,out=X)
+        BackSubstitution(LU,X,out=X)
+
+        return X
+
+
 def SolveSystem(A,B):
     ''' 
     SolveSystem(A,B)
     BSV:  Accepts both (n,1) and (n,) for B.  Returns shape (n,1)
     
     SystemSolve computes the solution to AX=B by elimination in the case that
-    A is a square nxn matrix
+    A is a square nxn matrix.  The elimination is carried out with
+    LUFactorization.  To solve several systems with the same A, use Solver
+    to avoid repeating the elimination.
     
     Parameters
     ----------
@@ -615,20 +1836,161 @@ def SolveSystem(A,B):
     n = A.shape[0]  # n is number of rows and columns in A
     B.shape = (n,1)
     
-    # Join A and B to make the augmented matrix
-    A_augmented = np.hstack((A,B))
+    X = Solver(A).solve(B)
     
-    # Carry out elimination    
-    R = RowReduction(A_augmented)
+    return X
 
-    # Split R back into nxn piece and nx1 piece
-    B_reduced = R[:,n:n+1]
-    A_reduced = R[:,0:n]
 
-    # Do back substitution
-    X = BackSubstitution(A_reduced,B_reduced)
-    
-    return X
+def SubspaceIteration(A, k, X = None, tolerance = 1e-8, max_iterations = 1000):
+    '''
+    SubspaceIteration(A, k, X = None, tolerance = 1e-8, max_iterations = 1000)
+
+    SubspaceIteration approximates the k eigenvalues of largest magnitude
+    of the nxn matrix A, together with unit eigenvectors.  This is the 
+    power method applied to k vectors at once.  At each step the vectors 
+    are multiplied by A, and then replaced with an orthonormal basis for 
+    the space they span using QRFactorization.  The eigenvalues and 
+    eigenvectors are estimated from the kxk matrix Q^TAQ.
+
+    The iteration stops when the magnitude of AX - X*eigenvalue is less 
+    than tolerance for every pair, or after max_iterations iterations.  If
+    A has complex eigenvalues among the k largest, the results are complex.
+
+    Parameters
+    ----------
+    A : NumPy array object of dimension nxn
+    k : int
+    X : optional NumPy array object of dimension nxk, the starting vectors
+    tolerance : optional float
+    max_iterations : optional int
+
+    Returns
+    -------
+    eigenvalues : NumPy array object of dimension k, largest magnitude first
+    X : NumPy array object of dimension nxk, whose columns are eigenvectors
+    info : dictionary with the number of 'iterations', the final 
+           'residual' magnitudes, and whether the iteration 'converged'
+    '''
+    # Check shape of A
+    if (A.shape[0] != A.shape[1]):
+        print("SubspaceIteration accepts only square arrays.")
+        return None
+    n = A.shape[0]
+    Q, R = QRFactorization(_StartingVectors(n,k,X),method='householder')
+
+    m = 0
+    while (True):
+        Y = A@Q
+        # Estimate eigenpairs from the projection of A onto the subspace
+        eigenvalues, V = np.linalg.eig(Q.transpose()@Y)
+        order = np.argsort(-np.abs(eigenvalues))
+        eigenvalues = eigenvalues[order]
+        V = V[:,order]
+        X = Q@V
+        residuals = np.sqrt(np.sum(np.abs(Y@V - X*eigenvalues)**2,axis=0))
+        
+        if (m >= max_iterations or np.all(residuals < tolerance)):
+            break
+        Q, R = QRFactorization(Y,method='householder')
+        m = m + 1
+
+    if (np.all(np.isreal(eigenvalues))):
+        eigenvalues = np.real(eigenvalues)
+        X = np.real(X)
+    info = {'iterations':m, 'residual':residuals, 
+            'converged':bool(np.all(residuals < tolerance))}
+    return eigenvalues, X, info
+
+
+def Trajectory(A, X, T, out = None, tolerance = None):
+    '''
+    Trajectory(A, X, T, out = None, tolerance = None)
+
+    Trajectory computes the states X_0, X_1, ..., X_T of the dynamical
+    system X_t = AX_{t-1} with X_0 = X.  X may be a single state of shape 
+    (n,) or nx1, or an nxm array whose columns are m different initial 
+    states, which are all advanced together with one matrix product at 
+    each step.
+
+    The states are written into out, which must have dimension (T+1,)+X.shape
+    if it is given, so that the same array can be reused.  If tolerance is
+    given, the computation stops as soon as no entry changes by more than 
+    tolerance in a step, and only the states computed up to that point are
+    returned.
+
+    Example
+    -------
+    results = Trajectory(A,X,20)
+    s = results[:,0]   # The first entry of the state at each time
+
+    Parameters
+    ----------
+    A : NumPy array object of dimension nxn
+    X : NumPy array object of dimension (n,), nx1, or nxm
+    T : int
+    out : optional NumPy array object of dimension (T+1,)+X.shape
+    tolerance : optional float
+
+    Returns
+    -------
+    results : NumPy array object of dimension (t+1,)+X.shape, where t = T 
+              unless a steady state was found at an earlier time t.  
+              results[t] is the state X_t.
+    '''
+    shape = (T+1,) + X.shape
+    if (out is None):
+        out = np.empty(shape,dtype=np.result_type(A,X,'float64'))
+    elif (out.shape != shape):
+        raise ValueError("out must have dimension (T+1,)+X.shape.")
+
+    out[0] = X
+    for t in range(T):
+        np.matmul(A,out[t],out=out[t+1])
+        if (tolerance is not None):
+            if (np.max(np.abs(out[t+1] - out[t])) <= tolerance):
+                return out[:t+2]
+    return out
+
+def TrajectorySteps(A, X, T = None, tolerance = None):
+    '''
+    TrajectorySteps(A, X, T = None, tolerance = None)
+
+    TrajectorySteps is a generator that produces the states X_0, X_1, ...
+    of the dynamical system X_t = AX_{t-1} with X_0 = X one at a time, so 
+    that long trajectories can be processed without storing every state.
+    X may be a single state or an nxm array of m states, as in Trajectory.
+
+    The states continue until X_T if T is given, and until a steady state 
+    is reached (no entry changes by more than tolerance) if tolerance is 
+    given.  If neither is given, the states continue indefinitely.
+
+    Example
+    -------
+    for t, X_t in enumerate(TrajectorySteps(A,X,tolerance=1e-8)):
+        ...
+
+    Parameters
+    ----------
+    A : NumPy array object of dimension nxn
+    X : NumPy array object of dimension (n,), nx1, or nxm
+    T : optional int
+    tolerance : optional float
+
+    Yields
+    ------
+    X_t : NumPy array object with the same dimension as X
+    '''
+    X = np.array(X,dtype=np.result_type(A,X,'float64'))
+    yield X
+    t = 0
+    while (T is None or t < T):
+        X_new = A@X
+        yield X_new
+        t = t + 1
+        if (tolerance is not None):
+            if (np.max(np.abs(X_new - X)) <= tolerance):
+                return
+        X = X_new
 
 
 